@@ -0,0 +1,112 @@
+# ----------------------------------File Header-------------------------------------------
+# archive.py
+# Purpose: Move settled bills, payments and transactions older than ARCHIVE_AFTER_DAYS out
+#          of the hot tables into their archive twins, and help readers reach both tiers.
+
+# ----------------------------------Imports-------------------------------------------
+import click
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, delete, exists, func, literal, union_all, DateTime
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import (Bill, Payment, Transaction, PaymentOrder,
+                    ArchivedBill, ArchivedPayment, ArchivedTransaction)
+
+# ----------------------------------Tiers-------------------------------------------
+ARCHIVES = {Bill: ArchivedBill, Payment: ArchivedPayment, Transaction: ArchivedTransaction}
+
+def archive_cutoff(now=None):
+    """Rows created before this are eligible for archiving."""
+    days = current_app.config.get("ARCHIVE_AFTER_DAYS", 365)
+    return (now or datetime.utcnow()) - timedelta(days=days)
+
+def archived_column(column):
+    """The archive-tier twin of a hot-table column, e.g. Bill.amount_due -> ArchivedBill.amount_due."""
+    return getattr(ARCHIVES[column.class_], column.key)
+
+def newest_archived(model, user_id):
+    """``created_at`` of the user's newest archived row of ``model``, or None if nothing is archived."""
+    archive = ARCHIVES[model]
+    order = archive.created_at.desc() if archive is ArchivedBill else archive.id.desc()
+    return db.session.scalar(
+        select(archive.created_at).where(archive.user_id == user_id).order_by(order).limit(1)
+    )
+
+def needs_archive(model, user_id, start=None):
+    """True when a read starting at ``start`` (None = from the beginning) can reach archived rows."""
+    newest = newest_archived(model, user_id)
+    return newest is not None and (start is None or start <= newest)
+
+def both_tiers(hot_stmt, cold_stmt, order_key):
+    """UNION ALL of a hot and an archive SELECT with identical columns, newest ``order_key`` first."""
+    combined = union_all(hot_stmt, cold_stmt).subquery()
+    return select(*combined.c).order_by(combined.c[order_key].desc())
+
+# ----------------------------------Archiving-------------------------------------------
+def _candidates(model, cutoff):
+    """Ids query for rows of ``model`` that are settled and older than ``cutoff``."""
+    # SQLite hands out max(id) + 1, so the newest row always stays hot to keep archived ids unique.
+    below_max = model.id < select(func.max(model.id)).scalar_subquery()
+    if model is Transaction:
+        # Keep a bill's transactions hot while the bill itself is still payable.
+        pending = exists().where(Bill.id == Transaction.bill_id, Bill.status == "Pending")
+        return select(Transaction.id).where(Transaction.created_at < cutoff, below_max, ~pending)
+    if model is Payment:
+        return select(Payment.id).where(Payment.created_at < cutoff, below_max)
+    # A bill only leaves once nothing hot points at it.
+    referenced = exists().where(Transaction.bill_id == Bill.id)
+    return select(Bill.id).where(Bill.status != "Pending", Bill.created_at < cutoff, below_max, ~referenced)
+
+def _move(model, ids, now):
+    archive = ARCHIVES[model]
+    columns = [c.key for c in archive.__table__.columns if c.key != "archived_at"]
+    db.session.execute(
+        insert(archive).from_select(
+            columns + ["archived_at"],
+            select(*[model.__table__.c[key] for key in columns], literal(now, DateTime))
+                .where(model.id.in_(ids))
+        )
+    )
+    if model is Bill:
+        # Gateway orders are only needed while a bill can still be paid.
+        db.session.execute(delete(PaymentOrder).where(PaymentOrder.bill_id.in_(ids)))
+    db.session.execute(delete(model).where(model.id.in_(ids)))
+
+def archive_settled_records(cutoff=None, chunk_size=None):
+    """Archive everything eligible, one committed chunk at a time; returns counts per table.
+
+    Each chunk copies rows into the archive table and deletes them from the hot
+    one in the same transaction. Transactions go first so the bills they
+    reference become eligible in the same run. If another worker archives the
+    same chunk first, the duplicate archive key rolls this chunk back and the
+    run stops for that table.
+    """
+    cutoff = cutoff or archive_cutoff()
+    chunk_size = chunk_size or current_app.config.get("ARCHIVE_CHUNK_SIZE", 1000)
+    moved = {}
+    for model in (Transaction, Payment, Bill):
+        moved[model.__tablename__] = 0
+        query = _candidates(model, cutoff).order_by(model.id).limit(chunk_size)
+        while True:
+            ids = db.session.scalars(query).all()
+            if not ids:
+                break
+            try:
+                _move(model, ids, datetime.utcnow())
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                break
+            moved[model.__tablename__] += len(ids)
+    return moved
+
+# ----------------------------------CLI Command-------------------------------------------
+@click.command("archive-records")
+@click.option("--older-than-days", default=None, type=int,
+              help="Archive settled rows older than this (defaults to ARCHIVE_AFTER_DAYS).")
+def archive_records_command(older_than_days):
+    """Move old settled bills, payments and transactions into the archive tables."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days) if older_than_days else None
+    moved = archive_settled_records(cutoff)
+    click.echo(", ".join(f"{table}: {count}" for table, count in moved.items()) + " rows archived.")
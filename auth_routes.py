@@ -1,31 +1,49 @@
 # ---------------------------------- Imports ----------------------------------
-from flask import Blueprint, request, jsonify, Response
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, request, jsonify, Response, current_app, stream_with_context
 from flask_jwt_extended import (
     create_access_token, create_refresh_token,
     jwt_required, get_jwt, get_jwt_identity
 )
-from sqlalchemy import extract
 from extensions import db
-from models import User, TokenBlocklist, UserProfile, Transaction, Bill, Payment, Notification
-from email_utils import send_otp_email
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from models import (User, UserProfile, Transaction, Bill, Notification, BillGenerationJob,
+                    ArchivedTransaction, ArchivedBill, PaymentOrder)
+from email_outbox import queue_otp_email, wake_email_pool
+from dashboard_versions import (bump_version, get_version, changed_sections, dashboard_etag,
+                                read_sections_from_replica)
+from events import get_hub, publish_event, format_sse
+from dashboard_cache import get_dashboard_cache
+from bill_jobs import claim_job, run_job, job_to_dict, current_period
+from user_cache import current_user, current_user_id, current_user_is_admin, invalidate_user, token_claims
+from token_blocklist import revoke_token
+from password_hashing import get_password_hasher, HashingBusy
+from exports import EXPORTS, FORMATS, parse_filters, stream_export
+from rollups import add_rollups, bill_created, transaction_recorded, analytics_summary
+from penalties import quote_bill, quote_to_dict, quote_user_bills
+from settlement import settle_bill, order_penalty
+from archive import newest_archived
+from notifications import add_notification, notification_page, mark_read, unread_count
+from idempotency import idempotent
+from database import read_replica
+from bill_import import import_bills, read_rows, detect_format, create_bill_batch, publish_bills, BATCH_MODES
+from razorpay_webhooks import verify_webhook_signature, enqueue_webhook
+from background import run_in_background, wake_periodic
+from payment_gateway import (get_gateway, get_or_create_order, mark_order_paid, GatewayUnavailable, OrderInProgress,
+                             GATEWAY_FAILURES)
 from email_validator import validate_email, EmailNotValidError
 from datetime import datetime, timedelta,timezone
 import random
 import razorpay
-import hmac
-import hashlib
+import csv
 import json
+import time
+import queue
 
 # ---------------------------------- Blueprint Configuration ----------------------------------
 auth_bp = Blueprint("auth_bp", __name__, url_prefix="/auth")
 OTP_EXP_MINUTES = 5
 
-# ---------------------------------- Razorpay Configuration ----------------------------------
-RAZORPAY_KEY_ID = "rzp_test_RbDp1J1gZzApDr"
-RAZORPAY_KEY_SECRET = "jq2LiXt7vEpgeL2zcdWbAAVp"
-razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
-
 # ---------------------------------- OTP Generator ----------------------------------
 def _generate_otp():
     return f"{random.randint(100000, 999999):06d}"
@@ -75,18 +93,23 @@ def register():
         otp = _generate_otp()
         existing_user.otp = otp
         existing_user.otp_expiry = datetime.utcnow() + timedelta(minutes=OTP_EXP_MINUTES)
+        queue_otp_email(email, otp, expiry_minutes=OTP_EXP_MINUTES)
         db.session.commit()
-        send_otp_email(email, otp, expiry_minutes=OTP_EXP_MINUTES)
+        wake_email_pool()
         return jsonify({"msg": "New OTP sent", "email": email}), 200
-    hashed = generate_password_hash(password)
+    try:
+        hashed = get_password_hasher().hash(password)
+    except HashingBusy:
+        return jsonify({"msg": "Server busy, please retry"}), 503
     user = User(email=email, username=username, password_hash=hashed, is_verified=False)
     db.session.add(user)
     db.session.commit()
     otp = _generate_otp()
     user.otp = otp
     user.otp_expiry = datetime.utcnow() + timedelta(minutes=OTP_EXP_MINUTES)
+    queue_otp_email(email, otp, expiry_minutes=OTP_EXP_MINUTES)
     db.session.commit()
-    send_otp_email(email, otp, expiry_minutes=OTP_EXP_MINUTES)
+    wake_email_pool()
     return jsonify({"msg": "Registered — OTP sent to email", "email": email}), 201
 
 # ---------------------------------- Verify OTP ----------------------------------
@@ -106,6 +129,7 @@ def verify_otp():
     user.otp = None
     user.otp_expiry = None
     db.session.commit()
+    invalidate_user(user.id, user.email)
     if not UserProfile.query.filter_by(user_id=user.id).first():
         profile = UserProfile(
             user_id=user.id,
@@ -117,6 +141,7 @@ def verify_otp():
             balance=0.0
         )
         db.session.add(profile)
+        bump_version(user.id, "profile")
         db.session.commit()
     return jsonify({"msg": "Email verified & profile created"}), 200
 
@@ -127,12 +152,21 @@ def login():
     email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password_hash, password):
-        return jsonify({"msg": "Invalid credentials"}), 401
-    if not user.is_verified:
-        return jsonify({"msg": "Please verify email before logging in"}), 403
-    access = create_access_token(identity=str(user.email))
-    refresh = create_refresh_token(identity=str(user.email))
+    hasher = get_password_hasher()
+    try:
+        if not user or not hasher.verify(user.password_hash, password):
+            return jsonify({"msg": "Invalid credentials"}), 401
+        if not user.is_verified:
+            return jsonify({"msg": "Please verify email before logging in"}), 403
+        if hasher.needs_rehash(user.password_hash):
+            # Upgrade to the configured parameters while the plaintext is at hand
+            user.password_hash = hasher.hash(password)
+            db.session.commit()
+    except HashingBusy:
+        return jsonify({"msg": "Server busy, please retry"}), 503
+    claims = token_claims(user)
+    access = create_access_token(identity=str(user.email), additional_claims=claims)
+    refresh = create_refresh_token(identity=str(user.email), additional_claims=claims)
     return jsonify({
         "msg": "Login successful",
         "access_token": access,
@@ -144,93 +178,282 @@ def login():
 @auth_bp.route("/refresh", methods=["POST"])
 @jwt_required(refresh=True)
 def refresh():
-    identity = get_jwt_identity()
-    new_access = create_access_token(identity=identity)
+    # Claims come from the current row, not the refresh token, so a role change or a
+    # deleted account takes effect on the next refresh rather than when the token expires.
+    uid = get_jwt().get("uid")
+    if uid is not None:
+        user = db.session.get(User, uid)
+    else:
+        # Refresh tokens issued before claims were added only carry the email.
+        user = User.query.filter_by(email=get_jwt_identity()).first()
+    if not user:
+        return jsonify({"msg": "User not found"}), 401
+    new_access = create_access_token(identity=user.email, additional_claims=token_claims(user))
     return jsonify({"access_token": new_access}), 200
 
 # ---------------------------------- Logout ----------------------------------
 @auth_bp.route("/logout", methods=["POST"])
 @jwt_required()
 def logout():
-    jti = get_jwt()["jti"]
-    db.session.add(TokenBlocklist(jti=jti))
+    revoke_token(get_jwt())
     db.session.commit()
     return jsonify({"msg": "Logged out"}), 200
 
+# ---------------------------------- Transaction History ----------------------------------
+IST = timezone(timedelta(hours=5, minutes=30))
+
+def _page_size(raw):
+    default = current_app.config.get("TRANSACTIONS_PAGE_SIZE", 20)
+    maximum = current_app.config.get("TRANSACTIONS_MAX_PAGE_SIZE", 100)
+    try:
+        size = int(raw) if raw is not None else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+def _transaction_page(user_id, cursor=None, limit=None):
+    """Return one newest-first page of transactions and the cursor for the next page.
+
+    Bills are pulled in with the same query, and the cursor is the last
+    ``Transaction.id`` seen, so page cost does not depend on account age.
+    The archive tier is only read for users with archived rows, and only once
+    the page runs past the hot rows or reaches back to the newest archived one.
+    """
+    limit = _page_size(limit)
+    query = db.session.query(Transaction, Bill.bill_type) \
+                      .outerjoin(Bill, Bill.id == Transaction.bill_id) \
+                      .filter(Transaction.user_id == user_id)
+    if cursor is not None:
+        query = query.filter(Transaction.id < cursor)
+    rows = query.order_by(Transaction.id.desc()).limit(limit + 1).all()
+
+    newest = newest_archived(Transaction, user_id)
+    if newest is not None and (len(rows) <= limit or rows[-1][0].created_at <= newest):
+        archived = db.session.query(ArchivedTransaction,
+                                    func.coalesce(Bill.bill_type, ArchivedBill.bill_type)) \
+                             .outerjoin(Bill, Bill.id == ArchivedTransaction.bill_id) \
+                             .outerjoin(ArchivedBill, ArchivedBill.id == ArchivedTransaction.bill_id) \
+                             .filter(ArchivedTransaction.user_id == user_id)
+        if cursor is not None:
+            archived = archived.filter(ArchivedTransaction.id < cursor)
+        archived = archived.order_by(ArchivedTransaction.id.desc()).limit(limit + 1).all()
+        if archived:
+            rows = sorted(rows + archived, key=lambda r: r[0].id, reverse=True)[:limit + 1]
+
+    items = []
+    for t, bill_type in rows[:limit]:
+        items.append({
+            "id": t.id,
+            "date": t.created_at.strftime("%Y-%m-%d"),
+            "time": t.created_at.replace(tzinfo=timezone.utc).astimezone(IST).strftime("%I:%M:%S %p"),
+            "plan": bill_type or "N/A",
+            "amount": float(t.amount),
+            "status": t.status
+        })
+    next_cursor = items[-1]["id"] if len(rows) > limit else None
+    return items, next_cursor
+
+@auth_bp.route("/transactions", methods=["GET"])
+@jwt_required()
+def transaction_history():
+    user = current_user()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    cursor = request.args.get("cursor", type=int)
+    items, next_cursor = _transaction_page(user.id, cursor, request.args.get("limit"))
+    return jsonify({"transactions": items, "next_cursor": next_cursor}), 200
+
+# ---------------------------------- Notifications ----------------------------------
+@auth_bp.route("/notifications", methods=["GET"])
+@jwt_required()
+def list_notifications():
+    user_id = current_user_id()
+    cursor = request.args.get("cursor", type=int)
+    unread_only = request.args.get("unread", "").lower() in ("1", "true", "yes")
+    items, next_cursor = notification_page(user_id, cursor, _page_size(request.args.get("limit")), unread_only)
+    return jsonify({"notifications": items, "next_cursor": next_cursor,
+                    "unread_count": unread_count(user_id)}), 200
+
+@auth_bp.route("/notifications/unread-count", methods=["GET"])
+@jwt_required()
+def notifications_unread_count():
+    return jsonify({"unread_count": unread_count(current_user_id())}), 200
+
+@auth_bp.route("/notifications/read", methods=["POST"])
+@jwt_required()
+def mark_notifications_read():
+    """Mark notifications read: ``{"ids": [...]}``, ``{"up_to": id}``, or ``{}`` for all."""
+    user_id = current_user_id()
+    data = request.get_json(silent=True) or {}
+    ids, up_to = data.get("ids"), data.get("up_to")
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+        return jsonify({"error": "ids must be a list of integers"}), 400
+    if up_to is not None and not isinstance(up_to, int):
+        return jsonify({"error": "up_to must be an integer"}), 400
+    try:
+        marked = mark_read(user_id, ids, up_to)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print("mark_notifications_read error:", e)
+        return jsonify({"error": "Failed to update notifications"}), 500
+    if marked:
+        publish_event(user_id, "notifications_read", {"marked": marked})
+    return jsonify({"marked": marked, "unread_count": unread_count(user_id)}), 200
+
 # ---------------------------------- Dashboard Data ----------------------------------
+def _profile_section(user):
+    profile = UserProfile.query.filter_by(user_id=user.id).first()
+    return {
+        "name": profile.name if profile else "User",
+        "email": user.email,
+        "username": user.username,
+        "avg_spend": float(profile.total_amount / profile.total_payments)
+                     if profile and profile.total_payments > 0 else 0.0,
+        "saved_methods": ["Razorpay", "UPI", "Wallet"]
+    }
+
+def _bills_section(user):
+    current_bill = Bill.query.filter_by(user_id=user.id, status="Pending") \
+                             .order_by(Bill.created_at.desc()).first()
+    upcoming_bills = Bill.query.filter_by(user_id=user.id, status="Pending") \
+                               .order_by(Bill.due_date.asc()).all()
+    return {
+        "bill": {
+            "id": current_bill.id if current_bill else None,
+            "utility": current_bill.bill_type if current_bill else "No pending bills",
+            "amount_due": float(current_bill.amount_due) if current_bill else 0.0,
+            "due_date": current_bill.due_date.isoformat() if current_bill else "—",
+            "status": current_bill.status if current_bill else "—"
+        },
+        "upcoming": [
+            {
+                "id": b.id,
+                "utility": b.bill_type,
+                "amount_due": float(b.amount_due),
+                "due_date": b.due_date.isoformat(),
+                "status": b.status
+            } for b in upcoming_bills
+        ]
+    }
+
+def _transactions_section(user):
+    recent_txn, next_cursor = _transaction_page(user.id)
+    return {"transactions": recent_txn, "transactions_next_cursor": next_cursor}
+
+def _notifications_section(user):
+    notifications = Notification.query.filter_by(user_id=user.id) \
+                                      .order_by(Notification.created_at.desc()).limit(5).all()
+    return {"notifications": [n.message for n in notifications],
+            "notifications_unread": unread_count(user.id)}
+
+DASHBOARD_SECTIONS = {
+    "profile": _profile_section,
+    "bills": _bills_section,
+    "transactions": _transactions_section,
+    "notifications": _notifications_section,
+}
+
 @auth_bp.route("/dashboard/data", methods=["GET"])
 @jwt_required()
 def dashboard_data():
     try:
-        user_email = get_jwt_identity()
-        user = User.query.filter_by(email=user_email).first()
+        user = current_user()
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        profile = UserProfile.query.filter_by(user_id=user.id).first()
-        current_bill = Bill.query.filter_by(user_id=user.id, status="Pending") \
-                                 .order_by(Bill.created_at.desc()).first()
-        upcoming_bills = Bill.query.filter_by(user_id=user.id, status="Pending") \
-                                   .order_by(Bill.due_date.asc()).all()
-        notifications = Notification.query.filter_by(user_id=user.id) \
-                                          .order_by(Notification.created_at.desc()).limit(5).all()
-
-        transactions = Transaction.query.filter_by(user_id=user.id) \
-                                        .order_by(Transaction.id.desc()).all()
-
-        recent_txn = []
-        IST = timezone(timedelta(hours=5, minutes=30))
-        for t in transactions:
-            bill = Bill.query.get(t.bill_id) if t.bill_id else None
-            recent_txn.append({
-                "id": t.id,
-                "date": t.created_at.strftime("%Y-%m-%d"),
-                "time": t.created_at.replace(tzinfo=timezone.utc).astimezone(IST).strftime("%I:%M:%S %p"),
-                "plan": bill.bill_type if bill else "N/A",
-                "amount": float(t.amount),
-                "status": t.status
-            })
-
-        dashboard = {
-            "name": profile.name if profile else "User",
-            "email": user.email,
-            "username": user.username,
-            "bill": {
-                "id": current_bill.id if current_bill else None,
-                "utility": current_bill.bill_type if current_bill else "No pending bills",
-                "amount_due": float(current_bill.amount_due) if current_bill else 0.0,
-                "due_date": current_bill.due_date if current_bill else "—",
-                "status": current_bill.status if current_bill else "—"
-            },
-            "upcoming": [
-                {
-                    "id": b.id,
-                    "utility": b.bill_type,
-                    "amount_due": float(b.amount_due),
-                    "due_date": b.due_date,
-                    "status": b.status
-                } for b in upcoming_bills
-            ],
-            "avg_spend": float(profile.total_amount / profile.total_payments)
-                         if profile and profile.total_payments > 0 else 0.0,
-            "saved_methods": ["Razorpay", "UPI", "Wallet"],
-            "transactions": recent_txn,
-            "notifications": [n.message for n in notifications]
-        }
-
-        return jsonify(dashboard), 200
+        current = get_version(user.id)
+        etag = dashboard_etag(current)
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+            resp.set_etag(etag)
+            return resp
+
+        since = request.args.get("since", type=int)
+        sections = changed_sections(current, since)
+        read_sections_from_replica(current)
+        dashboard = {"version": current.version, "sections": sections,
+                     "delta": len(sections) < len(DASHBOARD_SECTIONS)}
+        cache = get_dashboard_cache()
+        for name in sections:
+            section_version = getattr(current, f"{name}_version")
+            data = cache.get(user.id, name, section_version)
+            if data is None:
+                data = DASHBOARD_SECTIONS[name](user)
+                cache.put(user.id, name, section_version, data)
+            dashboard.update(data)
+
+        resp = jsonify(dashboard)
+        resp.set_etag(etag)
+        return resp, 200
 
     except Exception as e:
         print("Dashboard fetch error:", e)
         return jsonify({"error": "Something went wrong loading dashboard."}), 500
 
+# ---------------------------------- Dashboard Event Stream ----------------------------------
+@auth_bp.route("/events", methods=["GET"])
+@jwt_required()
+def dashboard_events():
+    user = current_user()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    user_id = user.id
+    version = get_version(user_id).version
+    hub = get_hub()
+    heartbeat = current_app.config.get("EVENT_STREAM_HEARTBEAT_SECONDS", 15)
+    max_seconds = current_app.config.get("EVENT_STREAM_MAX_SECONDS", 300)
+    # Release the pooled DB connection before the long-lived stream starts
+    db.session.remove()
+
+    q = hub.subscribe(user_id)
+    if q is None:
+        # The client falls back to polling /dashboard/data when the stream is refused.
+        return jsonify({"error": "Too many open event streams, poll instead"}), 503
+
+    def stream():
+        yield "retry: 3000\n\n"
+        yield format_sse("ready", {"version": version})
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline:
+            try:
+                event, data = q.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event, data)
+
+    response = Response(stream(), mimetype="text/event-stream",
+                        headers={"X-Accel-Buffering": "no"})
+    # Runs even if the client disconnects before the generator is first iterated.
+    response.call_on_close(lambda: hub.unsubscribe(user_id, q))
+    return response
+
+# ---------------------------------- Dashboard Cache Stats ----------------------------------
+@auth_bp.route("/admin/cache-stats", methods=["GET"])
+@jwt_required()
+def dashboard_cache_stats():
+    if not current_user_is_admin():
+        return jsonify({"error": "Access denied. Admins only."}), 403
+    return jsonify({"dashboard": get_dashboard_cache().stats()}), 200
+
+# ---------------------------------- Admin Analytics ----------------------------------
+@auth_bp.route("/admin/analytics", methods=["GET"])
+@jwt_required()
+def admin_analytics():
+    if not current_user_is_admin():
+        return jsonify({"error": "Access denied. Admins only."}), 403
+    months = max(1, min(request.args.get("months", 12, type=int), 60))
+    return jsonify(analytics_summary(months)), 200
+
 # ---------------------------------- Bill Payment ----------------------------------
 @auth_bp.route("/bill/pay", methods=["POST"])
 @jwt_required()
+@idempotent
 def pay_bill():
     try:
-        user_email = get_jwt_identity()
-        user = User.query.filter_by(email=user_email).first()
+        user = current_user()
         if not user:
             return jsonify({"error": "User not found"}), 404
         data = request.get_json() or {}
@@ -245,10 +468,9 @@ def pay_bill():
         if bill.status == "Paid":
             return jsonify({"msg": "Bill already paid"}), 200
 
-        today = datetime.utcnow().date()
-        due_date = datetime.strptime(bill.due_date, "%Y-%m-%d").date()
-        penalty = 10 * (today - due_date).days if today > due_date else 0
-        total_amount = bill.amount_due + penalty if penalty else bill.amount_due
+        quote = quote_bill(bill)
+        penalty = quote.penalty
+        total_amount = quote.total_amount
 
         if penalty > 0 and not confirm_payment:
             return jsonify({
@@ -259,53 +481,22 @@ def pay_bill():
                 "total_amount": total_amount
             }), 200
 
-        if penalty > 0:
-            bill.amount_due = total_amount
-            db.session.add(Notification(
-                user_id=user.id,
-                message=f"⚠️ Penalty of ₹{penalty} added for {bill.bill_type} bill."
-            ))
-
-        bill.status = "Paid"
-        db.session.add(bill)
-
-        payment = Payment(
-            user_id=user.id,
-            plan=bill.bill_type,
-            amount=bill.amount_due,
-            status="Paid",
-            provider="UtilityPay",
-            due_date=bill.due_date
-        )
-        db.session.add(payment)
-
-        txn = Transaction(
-            user_id=user.id,
-            bill_id=bill.id,
-            amount=bill.amount_due,
-            method=method,
-            status="Success"
-        )
-        db.session.add(txn)
-
-        profile = UserProfile.query.filter_by(user_id=user.id).first()
-        if profile:
-            profile.total_payments = (profile.total_payments or 0) + 1
-            profile.total_amount = (profile.total_amount or 0.0) + float(bill.amount_due)
-            db.session.add(profile)
-
-        db.session.add(Notification(
-            user_id=user.id,
-            message=f"{bill.bill_type} bill of ₹{bill.amount_due:.2f} paid successfully."
-        ))
-
+        settled = settle_bill(bill, provider="UtilityPay", method=method, penalty=penalty)
+        if settled is None:
+            # A concurrent request settled this bill first
+            db.session.rollback()
+            return jsonify({"msg": "Bill already paid"}), 200
+        payment = settled.payment
         db.session.commit()
+        publish_event(user.id, "payment", {"bill_id": settled.bill_id, "status": "Paid",
+                                           "amount": settled.total_amount})
+        publish_event(user.id, "notification", {"message": settled.message})
         return jsonify({
             "msg": f"Payment successful{f' (Penalty ₹{penalty})' if penalty else ''}",
-            "bill_id": bill.id,
-            "original_amount": float(bill.amount_due) - penalty,
+            "bill_id": settled.bill_id,
+            "original_amount": settled.original_amount,
             "penalty": penalty,
-            "total_amount": float(bill.amount_due),
+            "total_amount": settled.total_amount,
             "payment": {
                 "id": payment.id,
                 "date": payment.created_at.strftime("%Y-%m-%d"),
@@ -323,50 +514,41 @@ def pay_bill():
 @auth_bp.route("/generate-bills", methods=["POST"])
 @jwt_required()
 def generate_bills():
-    user_email = get_jwt_identity()
-    admin = User.query.filter_by(email=user_email).first()
-    if not admin or not admin.is_admin:
+    if not current_user_is_admin():
         return jsonify({"error": "Access denied. Admins only."}), 403
     try:
-        users = User.query.filter_by(is_verified=True, is_admin=False).all()
-        bill_types = ["Electricity", "Water", "Internet", "Gas"]
-        now = datetime.utcnow()
-        bills_created = 0
-        for u in users:
-            existing_bill = Bill.query.filter(
-                Bill.user_id == u.id,
-                extract('month', Bill.created_at) == now.month,
-                extract('year', Bill.created_at) == now.year
-            ).first()
-            if existing_bill:
-                continue
-            for bt in bill_types:
-                db.session.add(Bill(
-                    user_id=u.id,
-                    bill_type=bt,
-                    amount_due=round(random.uniform(300, 1200), 2),
-                    due_date=(now + timedelta(days=random.randint(5, 15))).strftime("%Y-%m-%d"),
-                    status="Pending"
-                ))
-            db.session.add(Notification(
-                user_id=u.id,
-                message=f"New monthly bills have been generated for {now.strftime('%B %Y')}."
-            ))
-            bills_created += 1
-        db.session.commit()
-        return jsonify({"message": f"✅ Monthly bills generated for {bills_created} new users."}), 200
+        job, claimed = claim_job(current_period())
+        if claimed:
+            run_in_background(current_app._get_current_object(), run_job, job.id,
+                              name=f"bill-job-{job.id}")
+            message = f"⏳ Generating bills for {job.total_users} users."
+        else:
+            message = f"⏳ Bill generation for {job.period} is already running."
+        return jsonify({
+            "message": message,
+            "job": job_to_dict(job),
+            "status_url": f"{auth_bp.url_prefix}/generate-bills/{job.id}"
+        }), 202
     except Exception as e:
         db.session.rollback()
         print("generate_bills error:", e)
         return jsonify({"error": f"Failed to generate bills: {str(e)}"}), 500
 
+@auth_bp.route("/generate-bills/<int:job_id>", methods=["GET"])
+@jwt_required()
+def generate_bills_status(job_id):
+    if not current_user_is_admin():
+        return jsonify({"error": "Access denied. Admins only."}), 403
+    job = db.session.get(BillGenerationJob, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_to_dict(job)), 200
+
 # ---------------------------------- Generate Custom Bill ----------------------------------
 @auth_bp.route("/generate-custom-bill", methods=["POST"])
 @jwt_required()
 def generate_custom_bill():
-    user_email = get_jwt_identity()
-    admin = User.query.filter_by(email=user_email).first()
-    if not admin or not admin.is_admin:
+    if not current_user_is_admin():
         return jsonify({"error": "Access denied. Admins only."}), 403
     data = request.get_json()
     target_email = data.get("email")
@@ -375,6 +557,10 @@ def generate_custom_bill():
     due_date = data.get("due_date")
     if not all([target_email, bill_type, amount_due, due_date]):
         return jsonify({"error": "Missing required fields"}), 400
+    try:
+        due_date = datetime.strptime(due_date, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return jsonify({"error": "due_date must be YYYY-MM-DD"}), 400
     user = User.query.filter_by(email=target_email, is_verified=True, is_admin=False).first()
     if not user:
         return jsonify({"error": "User not found or not verified"}), 404
@@ -386,33 +572,114 @@ def generate_custom_bill():
             due_date=due_date,
             status="Pending"
         ))
-        db.session.add(Notification(
-            user_id=user.id,
-            message=f"A new {bill_type} bill of ₹{amount_due} has been added."
-        ))
+        add_notification(user.id, f"A new {bill_type} bill of ₹{amount_due} has been added.")
+        add_rollups(bill_created(bill_type, amount_due, due_date))
+        bump_version(user.id, "bills", "notifications")
         db.session.commit()
+        publish_event(user.id, "bill", {"bill_type": bill_type})
+        publish_event(user.id, "notification",
+                      {"message": f"A new {bill_type} bill of ₹{amount_due} has been added."})
         return jsonify({"message": f"✅ {bill_type} bill added for {user.email}!"}), 200
     except Exception as e:
         db.session.rollback()
         print("generate_custom_bill error:", e)
         return jsonify({"error": f"Failed to generate custom bill: {str(e)}"}), 500
 
+@auth_bp.route("/generate-custom-bills", methods=["POST"])
+@jwt_required()
+def generate_custom_bills():
+    """Create many custom bills in one transaction; ``mode`` is all_or_nothing (default) or partial."""
+    if not current_user_is_admin():
+        return jsonify({"error": "Access denied. Admins only."}), 403
+    data = request.get_json(silent=True) or {}
+    items = data.get("bills")
+    mode = data.get("mode", "all_or_nothing")
+    max_items = current_app.config.get("BILL_BATCH_MAX_ITEMS", 1000)
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "bills must be a non-empty list"}), 400
+    if len(items) > max_items:
+        return jsonify({"error": f"At most {max_items} bills per request"}), 413
+    if mode not in BATCH_MODES:
+        return jsonify({"error": f"mode must be one of: {', '.join(BATCH_MODES)}"}), 400
+    try:
+        results, created = create_bill_batch(items, mode)
+        db.session.commit()
+    except IntegrityError:
+        # Another request claimed one of the external_refs between the check and the insert.
+        db.session.rollback()
+        return jsonify({"error": "external_ref already used; nothing was created"}), 409
+    except Exception as e:
+        db.session.rollback()
+        print("generate_custom_bills error:", e)
+        return jsonify({"error": "Failed to generate custom bills"}), 500
+    publish_bills(created)
+    failed = len(items) - len(created)
+    status = 422 if mode == "all_or_nothing" and failed else 200
+    return jsonify({"mode": mode, "created": len(created), "failed": failed, "results": results}), status
+
+# ---------------------------------- Import Bills ----------------------------------
+@auth_bp.route("/admin/import-bills", methods=["POST"])
+@jwt_required()
+def import_bills_file():
+    """Import a provider CSV/JSONL file, sent as the multipart ``file`` field or as the raw body."""
+    if not current_user_is_admin():
+        return jsonify({"error": "Access denied. Admins only."}), 403
+    upload = request.files.get("file")
+    stream = upload.stream if upload else request.stream
+    fmt = request.args.get("format") or detect_format(upload.filename if upload else None, request.content_type)
+    if fmt not in ("csv", "jsonl"):
+        return jsonify({"error": "format must be csv or jsonl"}), 400
+    chunk_size = current_app.config.get("BILL_IMPORT_CHUNK_SIZE", 1000)
+    max_errors = current_app.config.get("BILL_IMPORT_MAX_ERRORS", 1000)
+    try:
+        report = import_bills(read_rows(stream, fmt), chunk_size, max_errors)
+    except (ValueError, csv.Error) as e:
+        # Chunks before the bad bytes are committed; fixing the file and re-sending it is safe.
+        db.session.rollback()
+        return jsonify({"error": f"Could not read the file: {e}"}), 400
+    except Exception as e:
+        db.session.rollback()
+        print("import_bills error:", e)
+        return jsonify({"error": "Failed to import bills"}), 500
+    return jsonify(report.to_dict()), 200
+
 # ---------------------------------- Download Bills CSV ----------------------------------
 @auth_bp.route("/download_bills_csv")
 @jwt_required()
+@read_replica
 def download_bills_csv():
-    user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = current_user()
     if not user:
         return "User not found", 404
-    bills = Bill.query.filter_by(user_id=user.id).order_by(Bill.created_at.desc()).all()
-    def generate():
-        yield "ID,User ID,Bill Type,Amount Due,Due Date,Status,Created At\n"
-        for b in bills:
-            yield f'{b.id},{b.user_id},"{b.bill_type}",{b.amount_due:.2f},"{b.due_date}","{b.status}","{b.created_at.strftime("%Y-%m-%d")}"\n'
-    return Response(generate(), mimetype="text/csv",
+    return Response(stream_with_context(stream_export("bills", user.id)), mimetype="text/csv",
                     headers={"Content-Disposition": "attachment; filename=bills_history.csv"})
 
+# ---------------------------------- Export History ----------------------------------
+@auth_bp.route("/export/<kind>", methods=["GET"])
+@jwt_required()
+@read_replica
+def export_history(kind):
+    """Stream bills, payments or transactions; ?format=csv|jsonl&gzip=1&from=&to=&status="""
+    if kind not in EXPORTS:
+        return jsonify({"error": f"kind must be one of {', '.join(EXPORTS)}"}), 404
+    fmt = request.args.get("format", "csv")
+    if fmt not in FORMATS:
+        return jsonify({"error": "format must be csv or jsonl"}), 400
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    user = current_user()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+
+    gzip = request.args.get("gzip") in ("1", "true")
+    filename = f"{kind}_history.{fmt}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    mimetype = "application/gzip" if gzip else FORMATS[fmt]
+    body = stream_export(kind, user.id, fmt, gzip, **filters)
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+
 # ---------------------------------- Check Bill Penalty ----------------------------------
 @auth_bp.route("/bill/check-penalty", methods=["POST"])
 @jwt_required()
@@ -422,8 +689,7 @@ def check_penalty():
     if not bill_id:
         return jsonify({"error": "bill_id required"}), 400
 
-    user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
@@ -431,20 +697,27 @@ def check_penalty():
     if not bill:
         return jsonify({"error": "Bill not found"}), 404
 
-    today = datetime.utcnow().date()
-    due_date = datetime.strptime(bill.due_date, "%Y-%m-%d").date()
-    penalty = 0
-    if today > due_date:
-        days_overdue = (today - due_date).days
-        penalty = 10 * days_overdue
+    return jsonify(quote_to_dict(quote_bill(bill))), 200
 
-    total_amount = float(bill.amount_due) + penalty
+# ---------------------------------- Check Penalties (Batch) ----------------------------------
+@auth_bp.route("/bill/check-penalties", methods=["POST"])
+@jwt_required()
+def check_penalties():
+    """Quote every pending bill of the user, or only the given bill_ids, in one query."""
+    data = request.get_json(silent=True) or {}
+    bill_ids = data.get("bill_ids")
+    if bill_ids is not None and not isinstance(bill_ids, list):
+        return jsonify({"error": "bill_ids must be a list"}), 400
+
+    user = current_user()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
 
+    quotes = quote_user_bills(user.id, bill_ids)
     return jsonify({
-        "bill_type": bill.bill_type,
-        "amount_due": float(bill.amount_due),
-        "penalty": penalty,
-        "total_amount": total_amount
+        "bills": [quote_to_dict(q) for q in quotes],
+        "total_penalty": sum(q.penalty for q in quotes),
+        "total_amount": round(sum(q.total_amount for q in quotes), 2)
     }), 200
 
 # ---------------------------------- Record Failed Transaction ----------------------------------
@@ -459,8 +732,7 @@ def record_failed_transaction():
     if not bill_id or amount is None:
         return jsonify({"error": "bill_id and amount required"}), 400
 
-    user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
@@ -476,7 +748,10 @@ def record_failed_transaction():
         status="Failed"
     )
     db.session.add(txn)
+    add_rollups(transaction_recorded("Failed", amount))
+    bump_version(user.id, "transactions")
     db.session.commit()
+    publish_event(user.id, "payment", {"bill_id": bill.id, "status": "Failed"})
 
     return jsonify({"msg": "Failed transaction recorded"}), 200
 
@@ -484,8 +759,7 @@ def record_failed_transaction():
 @auth_bp.route("/bill/create-order", methods=["POST"])
 @jwt_required()
 def create_razorpay_order():
-    user_email = get_jwt_identity()
-    user = User.query.filter_by(email=user_email).first()
+    user = current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
@@ -498,35 +772,57 @@ def create_razorpay_order():
     if not bill:
         return jsonify({"error": "Bill not found"}), 404
 
-    today = datetime.utcnow().date()
-    due_date = datetime.strptime(bill.due_date, "%Y-%m-%d").date()
-    penalty = max(0, (today - due_date).days * 10)
-    total_amount = float(bill.amount_due) + penalty
+    quote = quote_bill(bill)
+    penalty = quote.penalty
+    total_amount = quote.total_amount
 
-    razorpay_order = razorpay_client.order.create({
-        "amount": int(total_amount * 100),
-        "currency": "INR",
-        "payment_capture": 1,
-        "notes": {"bill_id": str(bill.id), "user_id": str(user.id)}
-    })
+    try:
+        order_id, reused = get_or_create_order(bill, user.id, int(round(total_amount * 100)))
+    except GatewayUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    except OrderInProgress as e:
+        return jsonify({"error": str(e)}), 409
+    except GATEWAY_FAILURES as e:
+        print("create_razorpay_order error:", e)
+        return jsonify({"error": "Payment gateway error, please retry."}), 502
+    except razorpay.errors.BadRequestError as e:
+        return jsonify({"error": f"Payment gateway rejected the order: {e}"}), 400
 
     return jsonify({
-        "order_id": razorpay_order["id"],
+        "order_id": order_id,
+        "reused": reused,
         "total_amount": total_amount,
         "currency": "INR",
-        "key": RAZORPAY_KEY_ID,
+        "key": current_app.config["RAZORPAY_KEY_ID"],
         "bill_type": bill.bill_type,
         "penalty": penalty,
         "original_amount": float(bill.amount_due)
     }), 200
 
+# ---------------------------------- Razorpay Webhook ----------------------------------
+@auth_bp.route("/razorpay/webhook", methods=["POST"])
+def razorpay_webhook():
+    """Verify and queue a Razorpay event; the reconciler settles bills in the background."""
+    secret = current_app.config.get("RAZORPAY_WEBHOOK_SECRET")
+    if not secret:
+        return jsonify({"error": "Webhook not configured"}), 503
+    body = request.get_data()
+    if not verify_webhook_signature(body, request.headers.get("X-Razorpay-Signature"), secret):
+        return jsonify({"error": "Invalid signature"}), 400
+    try:
+        queued = enqueue_webhook(body, request.headers.get("X-Razorpay-Event-Id"))
+    except ValueError:
+        return jsonify({"error": "Invalid payload"}), 400
+    wake_periodic(current_app, "razorpay-reconciler")
+    return jsonify({"status": "queued" if queued else "duplicate"}), 200
+
 # ---------------------------------- Verify Razorpay Payment ----------------------------------
 @auth_bp.route("/bill/verify-payment", methods=["POST"])
 @jwt_required()
+@idempotent
 def verify_razorpay_payment():
     try:
-        user_email = get_jwt_identity()
-        user = User.query.filter_by(email=user_email).first()
+        user = current_user()
         if not user:
             return jsonify({"error": "User not found"}), 404
 
@@ -551,46 +847,25 @@ def verify_razorpay_payment():
 
         try:
             if razorpay_signature:
-                razorpay_client.utility.verify_payment_signature(params_dict)
+                get_gateway().verify_payment_signature(params_dict)
 
+            settled = None
             if bill.status != "Paid":
-                bill.status = "Paid"
-                db.session.add(bill)
-
-                payment = Payment(
-                    user_id=user.id,
-                    plan=bill.bill_type,
-                    amount=bill.amount_due,
-                    status="Paid",
-                    provider="Razorpay",
-                    due_date=bill.due_date,
-                    payment_id=razorpay_payment_id
+                # Settle the amount the order charged, as the webhook path does.
+                order = PaymentOrder.query.filter_by(order_id=razorpay_order_id, bill_id=bill.id).first() \
+                    if razorpay_order_id else None
+                penalty = order_penalty(bill, order)
+                settled = settle_bill(
+                    bill, provider="Razorpay", method="Razorpay", penalty=penalty, payment_id=razorpay_payment_id,
+                    message=f"{bill.bill_type} bill of ₹{float(bill.amount_due) + penalty:.2f} paid successfully via Razorpay."
                 )
-                db.session.add(payment)
-
-                txn = Transaction(
-                    user_id=user.id,
-                    bill_id=bill.id,
-                    amount=bill.amount_due,
-                    method="Razorpay",
-                    status="Success"
-                )
-                db.session.add(txn)
-
-                profile = UserProfile.query.filter_by(user_id=user.id).first()
-                if profile:
-                    profile.total_payments = (profile.total_payments or 0) + 1
-                    profile.total_amount = (profile.total_amount or 0.0) + float(bill.amount_due)
-                    db.session.add(profile)
-
-                notif = Notification(
-                    user_id=user.id,
-                    message=f"{bill.bill_type} bill of ₹{bill.amount_due:.2f} paid successfully via Razorpay."
-                )
-                db.session.add(notif)
-
+            if settled:
+                mark_order_paid(razorpay_order_id)
             db.session.commit()
-            return jsonify({"msg": "Payment successful via Razorpay", "bill_id": bill.id}), 200
+            if settled:
+                publish_event(user.id, "payment", {"bill_id": settled.bill_id, "status": "Paid"})
+                publish_event(user.id, "notification", {"message": settled.message})
+            return jsonify({"msg": "Payment successful via Razorpay", "bill_id": bill_id}), 200
 
         except razorpay.errors.SignatureVerificationError:
             txn = Transaction(
@@ -601,7 +876,10 @@ def verify_razorpay_payment():
                 status="Failed"
             )
             db.session.add(txn)
+            add_rollups(transaction_recorded("Failed", bill.amount_due))
+            bump_version(user.id, "transactions")
             db.session.commit()
+            publish_event(user.id, "payment", {"bill_id": bill.id, "status": "Failed"})
             return jsonify({"error": "Razorpay payment verification failed"}), 400
 
     except Exception as e:
@@ -616,7 +894,10 @@ def verify_razorpay_payment():
                 status="Failed"
             )
             db.session.add(txn)
+            add_rollups(transaction_recorded("Failed", bill.amount_due))
+            bump_version(user.id, "transactions")
             db.session.commit()
+            publish_event(user.id, "payment", {"bill_id": bill.id, "status": "Failed"})
         except:
             pass
         return jsonify({"error": "Failed to verify payment"}), 500
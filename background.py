@@ -0,0 +1,81 @@
+# ----------------------------------File Header-------------------------------------------
+# background.py
+# Purpose: Run work on daemon threads inside an application context.
+
+# ----------------------------------Imports-------------------------------------------
+import threading
+from extensions import db
+
+# ----------------------------------Run In Background-------------------------------------------
+def run_in_background(app, fn, *args, name=None):
+    """Run ``fn(*args)`` on a daemon thread with its own app context and DB session."""
+    def target():
+        with app.app_context():
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"background task {name or fn.__name__} error:", e)
+            finally:
+                db.session.remove()
+
+    thread = threading.Thread(target=target, name=name or fn.__name__, daemon=True)
+    thread.start()
+    return thread
+
+# ----------------------------------Periodic Tasks-------------------------------------------
+class PeriodicTask:
+    """Call ``fn()`` every ``interval`` seconds on a daemon thread, inside an app context.
+
+    The thread is started by ``ensure_started`` (registered as a before_request
+    hook), so each gunicorn worker runs its own copy; tasks must therefore be
+    safe to run concurrently, e.g. by claiming rows with a conditional UPDATE.
+    """
+
+    def __init__(self, app, fn, interval, name=None):
+        self.app = app
+        self.fn = fn
+        self.interval = interval
+        self.name = name or fn.__name__
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def ensure_started(self):
+        if self._thread:
+            return
+        with self._lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Run the task now instead of at the end of the current interval."""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    self.fn()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"periodic task {self.name} error:", e)
+                finally:
+                    db.session.remove()
+
+def schedule_periodic(app, fn, interval, name=None):
+    """Register ``fn`` to run every ``interval`` seconds once the app serves requests; 0 disables it."""
+    if not interval:
+        return None
+    task = PeriodicTask(app, fn, interval, name)
+    app.extensions.setdefault("periodic_tasks", {})[task.name] = task
+    app.before_request(task.ensure_started)
+    return task
+
+def wake_periodic(app, name):
+    task = app.extensions.get("periodic_tasks", {}).get(name)
+    if task:
+        task.wake()
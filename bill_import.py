@@ -0,0 +1,290 @@
+# ----------------------------------File Header-------------------------------------------
+# bill_import.py
+# Purpose: Create bills in bulk, either from provider CSV/JSONL files of any size or from
+#          an admin's batch request, resolving emails and inserting rows a chunk at a time.
+
+# ----------------------------------Imports-------------------------------------------
+import io
+import csv
+import json
+import math
+import click
+import hashlib
+from datetime import datetime
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import User, Bill, ArchivedBill
+from notifications import add_notifications
+from rollups import add_rollups, bill_created
+from dashboard_versions import bump_version
+from events import publish_event
+
+# ----------------------------------Settings-------------------------------------------
+CHUNK_ROWS = 1000
+# Distinct emails remembered across chunks of one import before the map is reset.
+MAX_CACHED_EMAILS = 200000
+FIELD_ALIASES = {"reference": "external_ref", "amount": "amount_due", "type": "bill_type"}
+
+# ----------------------------------Validation-------------------------------------------
+def bill_message(bill_type, amount_due):
+    return f"A new {bill_type} bill of ₹{amount_due} has been added."
+
+def auto_ref(email, bill_type, amount_due, due_date):
+    """Stable reference for rows without one, so the same row imported twice is recognised."""
+    key = f"{email}|{bill_type}|{amount_due:.2f}|{due_date.isoformat()}"
+    return "auto:" + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+def parse_bill(raw):
+    """Validate one bill dict; returns (bill, None) or (None, error message)."""
+    if not isinstance(raw, dict):
+        return None, "Expected an object"
+    raw = {FIELD_ALIASES.get(k, k): v for k, v in raw.items() if k}
+    email = str(raw.get("email") or "").strip().lower()
+    bill_type = str(raw.get("bill_type") or "").strip()
+    if not email or not bill_type or raw.get("amount_due") in (None, "") or not raw.get("due_date"):
+        return None, "Missing required fields"
+    if len(bill_type) > 50:
+        return None, "bill_type must be at most 50 characters"
+    try:
+        amount_due = round(float(raw["amount_due"]), 2)
+    except (TypeError, ValueError):
+        return None, "amount_due must be a number"
+    if not math.isfinite(amount_due) or amount_due <= 0:
+        return None, "amount_due must be greater than zero"
+    try:
+        due_date = datetime.strptime(str(raw["due_date"]).strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None, "due_date must be YYYY-MM-DD"
+    external_ref = str(raw.get("external_ref") or "").strip() or None
+    if external_ref and len(external_ref) > 100:
+        return None, "external_ref must be at most 100 characters"
+    return {"email": email, "bill_type": bill_type, "amount_due": amount_due,
+            "due_date": due_date, "external_ref": external_ref}, None
+
+# ----------------------------------Bulk Lookups-------------------------------------------
+def resolve_emails(emails, chunk_size=CHUNK_ROWS):
+    """Map each email to the id of a verified, non-admin user, with one IN query per chunk."""
+    emails = sorted(set(emails))
+    found = {}
+    for i in range(0, len(emails), chunk_size):
+        found.update(db.session.execute(
+            select(User.email, User.id).where(User.email.in_(emails[i:i + chunk_size]),
+                                              User.is_verified.is_(True), User.is_admin.is_(False))
+        ).all())
+    return found
+
+def existing_refs(refs):
+    """References already used by a bill in either the hot or the archive tier."""
+    refs = list(set(refs))
+    if not refs:
+        return set()
+    hot = db.session.scalars(select(Bill.external_ref).where(Bill.external_ref.in_(refs))).all()
+    cold = db.session.scalars(select(ArchivedBill.external_ref).where(ArchivedBill.external_ref.in_(refs))).all()
+    return set(hot) | set(cold)
+
+# ----------------------------------Insert-------------------------------------------
+def stage_bills(bills):
+    """Stage Bill rows plus their notifications, rollups and version bumps; returns the new ids.
+
+    ``bills`` are parse_bill() results with ``user_id`` added. The caller commits
+    and then calls ``publish_bills``.
+    """
+    if not bills:
+        return []
+    now = datetime.utcnow()
+    ids = db.session.scalars(
+        insert(Bill).returning(Bill.id, sort_by_parameter_order=True),
+        [{"user_id": b["user_id"], "bill_type": b["bill_type"], "amount_due": b["amount_due"],
+          "due_date": b["due_date"], "status": "Pending", "created_at": now,
+          "external_ref": b.get("external_ref")} for b in bills]
+    ).all()
+    add_notifications([{"user_id": b["user_id"], "message": bill_message(b["bill_type"], b["amount_due"]),
+                        "created_at": now} for b in bills])
+    add_rollups([entry for b in bills for entry in
+                 bill_created(b["bill_type"], b["amount_due"], b["due_date"], now)])
+    bump_version([b["user_id"] for b in bills], "bills", "notifications")
+    return ids
+
+def publish_bills(bills):
+    user_ids = sorted({b["user_id"] for b in bills})
+    if user_ids:
+        publish_event(user_ids, "bill", {"count": len(bills)})
+        publish_event(user_ids, "notification", {"message": "New bills have been added to your account."})
+
+# ----------------------------------File Parsing-------------------------------------------
+def read_rows(stream, fmt):
+    """Yield (row_number, dict or None, error) from a binary or text stream without loading it whole."""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for n, row in enumerate(csv.DictReader(stream), start=2):  # row 1 is the header
+            yield n, row, None
+        return
+    for n, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield n, json.loads(line), None
+        except ValueError:
+            yield n, None, "Invalid JSON"
+
+def detect_format(filename, content_type=None):
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson", ".json")) or "ndjson" in (content_type or ""):
+        return "jsonl"
+    return "csv"
+
+# ----------------------------------Import-------------------------------------------
+class ImportReport:
+    def __init__(self, max_errors=None):
+        self.total = 0
+        self.created = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def error(self, row, message, ref=None):
+        self.failed += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "external_ref": ref, "error": message})
+
+    def to_dict(self):
+        return {"total_rows": self.total, "created": self.created, "duplicates": self.duplicates,
+                "failed": self.failed, "errors": sorted(self.errors, key=lambda e: e["row"]),
+                "errors_truncated": self.failed > len(self.errors)}
+
+def _lookup_users(chunk, emails):
+    """Fill ``emails`` with the user ids for this chunk's addresses not seen earlier in the import."""
+    missing = {b["email"] for _, b in chunk if b["email"] not in emails}
+    if len(emails) + len(missing) > MAX_CACHED_EMAILS:
+        emails.clear()
+        missing = {b["email"] for _, b in chunk}
+    if missing:
+        found = resolve_emails(missing)
+        emails.update({email: found.get(email) for email in missing})
+
+def _import_chunk(chunk, emails, report):
+    """Insert one chunk of (row, bill) pairs and commit; already-imported references count as duplicates."""
+    _lookup_users(chunk, emails)
+    ready = []
+    for row, bill in chunk:
+        bill["user_id"] = emails.get(bill["email"])
+        if bill["user_id"] is None:
+            report.error(row, "User not found or not verified", bill["external_ref"])
+        else:
+            ready.append(bill)
+
+    for attempt in range(2):
+        seen = existing_refs(b["external_ref"] for b in ready)
+        fresh = []
+        for bill in ready:
+            if bill["external_ref"] not in seen:
+                seen.add(bill["external_ref"])
+                fresh.append(bill)
+        try:
+            stage_bills(fresh)
+            db.session.commit()
+            break
+        except IntegrityError:
+            # A concurrent import of the same file claimed some references first; re-check them once.
+            db.session.rollback()
+            if attempt:
+                raise
+    report.created += len(fresh)
+    report.duplicates += len(ready) - len(fresh)
+    publish_bills(fresh)
+
+def import_bills(rows, chunk_size=CHUNK_ROWS, max_errors=None):
+    """Import ``(row_number, raw, error)`` tuples as produced by ``read_rows``; returns an ImportReport.
+
+    Each chunk resolves its unknown emails with one IN query (remembered for the
+    rest of the import), drops references that already exist, then inserts the
+    bills, notifications and rollups and commits. Importing a file again, or
+    resuming after a crash, therefore creates only the bills still missing.
+    """
+    report = ImportReport(max_errors)
+    emails = {}
+    chunk = []
+    for row, raw, error in rows:
+        report.total += 1
+        if error is None:
+            bill, error = parse_bill(raw)
+        if error:
+            ref = (raw.get("external_ref") or raw.get("reference")) if isinstance(raw, dict) else None
+            report.error(row, error, ref or None)
+            continue
+        bill["external_ref"] = bill["external_ref"] or auto_ref(
+            bill["email"], bill["bill_type"], bill["amount_due"], bill["due_date"])
+        chunk.append((row, bill))
+        if len(chunk) >= chunk_size:
+            _import_chunk(chunk, emails, report)
+            chunk = []
+    if chunk:
+        _import_chunk(chunk, emails, report)
+    return report
+
+# ----------------------------------Batch Requests-------------------------------------------
+BATCH_MODES = ("all_or_nothing", "partial")
+
+def create_bill_batch(items, mode="all_or_nothing"):
+    """Validate and stage a list of bill dicts in the current transaction; returns (results, staged bills).
+
+    Every item is checked and every email resolved before anything is inserted.
+    In ``all_or_nothing`` mode one bad item stages nothing; in ``partial`` mode
+    the valid items are staged and the rest reported. ``results`` holds one
+    entry per item, in request order. The caller commits and publishes.
+    """
+    results = [None] * len(items)
+    parsed = []
+    for i, raw in enumerate(items):
+        bill, error = parse_bill(raw)
+        if error:
+            results[i] = {"index": i, "status": "error", "error": error}
+        else:
+            parsed.append((i, bill))
+
+    users = resolve_emails(b["email"] for _, b in parsed)
+    taken = existing_refs(b["external_ref"] for _, b in parsed if b["external_ref"])
+    ready = []
+    for i, bill in parsed:
+        bill["user_id"] = users.get(bill["email"])
+        if bill["user_id"] is None:
+            results[i] = {"index": i, "status": "error", "error": "User not found or not verified"}
+        elif bill["external_ref"] in taken:
+            results[i] = {"index": i, "status": "error", "error": "external_ref already used"}
+        else:
+            if bill["external_ref"]:
+                taken.add(bill["external_ref"])
+            ready.append((i, bill))
+
+    if mode == "all_or_nothing" and len(ready) < len(items):
+        for i, _ in ready:
+            results[i] = {"index": i, "status": "skipped", "error": "Batch rejected"}
+        return results, []
+    ids = stage_bills([b for _, b in ready])
+    for (i, bill), bill_id in zip(ready, ids):
+        results[i] = {"index": i, "status": "created", "bill_id": bill_id, "email": bill["email"]}
+    return results, [b for _, b in ready]
+
+# ----------------------------------CLI Command-------------------------------------------
+@click.command("import-bills")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None,
+              help="File format (guessed from the extension by default).")
+@click.option("--chunk-size", default=CHUNK_ROWS, type=int, help="Rows per committed chunk.")
+@click.option("--errors-out", default=None, type=click.Path(dir_okay=False),
+              help="Write every rejected row to this CSV file.")
+def import_bills_command(path, fmt, chunk_size, errors_out):
+    """Import provider bills from a CSV or JSONL file; safe to re-run."""
+    with open(path, "rb") as f:
+        report = import_bills(read_rows(f, fmt or detect_format(path)), chunk_size)
+    click.echo(f"{report.total} rows: {report.created} created, {report.duplicates} duplicates, "
+               f"{report.failed} rejected.")
+    if errors_out and report.errors:
+        with open(errors_out, "w", newline="") as out:
+            writer = csv.DictWriter(out, fieldnames=["row", "external_ref", "error"])
+            writer.writeheader()
+            writer.writerows(report.errors)
+        click.echo(f"Rejected rows written to {errors_out}.")
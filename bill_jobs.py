@@ -0,0 +1,197 @@
+# ----------------------------------File Header-------------------------------------------
+# bill_jobs.py
+# Purpose: Set-based, resumable monthly bill generation that runs outside the request thread.
+
+# ----------------------------------Imports-------------------------------------------
+import random
+import click
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import exists, insert, update, or_
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import User, Bill, BillGenerationJob
+from dashboard_versions import bump_version
+from events import publish_event
+from rollups import add_rollups, bill_created
+from notifications import add_notifications
+
+# ----------------------------------Settings-------------------------------------------
+BILL_TYPES = ["Electricity", "Water", "Internet", "Gas"]
+STALE_AFTER = timedelta(minutes=5)
+
+# ----------------------------------Period Helpers-------------------------------------------
+def current_period():
+    return datetime.utcnow().strftime("%Y-%m")
+
+def period_bounds(period):
+    start = datetime.strptime(period, "%Y-%m")
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+def period_timestamp(now, start, end):
+    """``created_at`` for bills of the period [start, end): now, or the period's last instant for a past month.
+
+    The anti-join finds already-billed users by ``created_at`` inside the period,
+    so back-filled bills must carry a timestamp inside it for reruns to skip them.
+    """
+    return min(max(now, start), end - timedelta(microseconds=1))
+
+# ----------------------------------Anti-Join-------------------------------------------
+def _users_without_bills(start, end):
+    """Verified non-admin users with no bill created in [start, end)."""
+    has_bill = exists().where(
+        Bill.user_id == User.id,
+        Bill.created_at >= start,
+        Bill.created_at < end
+    )
+    return db.session.query(User.id).filter(
+        User.is_verified.is_(True),
+        User.is_admin.is_(False),
+        ~has_bill
+    )
+
+def _next_chunk(start, end, after_id, size):
+    query = _users_without_bills(start, end).filter(User.id > after_id) \
+                                            .order_by(User.id).limit(size)
+    return [uid for (uid,) in query]
+
+# ----------------------------------Job Lifecycle-------------------------------------------
+def job_to_dict(job):
+    return {
+        "id": job.id,
+        "period": job.period,
+        "status": job.status,
+        "total_users": job.total_users,
+        "processed_users": job.processed_users,
+        "bills_created": job.bills_created,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+def claim_job(period):
+    """Create or claim the job for ``period``.
+
+    Returns ``(job, claimed)``. A job can be claimed when it is queued,
+    finished, failed, or running with a heartbeat older than ``STALE_AFTER``
+    (its worker died); a live run is left alone so two workers never bill the
+    same users at once. Every claim scans from the first user again: users
+    verified since the last run may have lower ids than where it stopped, and
+    the per-period anti-join already skips everyone who has been billed.
+    """
+    job = BillGenerationJob.query.filter_by(period=period).first()
+    if job is None:
+        try:
+            job = BillGenerationJob(period=period, status="Queued")
+            db.session.add(job)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            job = BillGenerationJob.query.filter_by(period=period).first()
+
+    now = datetime.utcnow()
+    rerun = job.status == "Completed"
+    values = {"status": "Running", "heartbeat_at": now, "error": None, "finished_at": None, "last_user_id": 0}
+    if rerun:
+        values.update(processed_users=0, bills_created=0)
+    result = db.session.execute(
+        update(BillGenerationJob)
+        .where(BillGenerationJob.id == job.id)
+        .where(or_(
+            BillGenerationJob.status.in_(["Queued", "Completed", "Failed"]),
+            BillGenerationJob.heartbeat_at < now - STALE_AFTER
+        ))
+        .values(**values)
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        return job, False
+
+    start, end = period_bounds(period)
+    pending = _users_without_bills(start, end).count()
+    db.session.execute(
+        update(BillGenerationJob)
+        .where(BillGenerationJob.id == job.id)
+        .values(total_users=BillGenerationJob.processed_users + pending)
+    )
+    db.session.commit()
+    db.session.refresh(job)
+    return job, True
+
+def run_job(job_id, chunk_size=None):
+    """Bill every user still missing bills for the job's period, one committed chunk at a time.
+
+    Each chunk inserts all Bills and Notifications for its users in bulk and
+    commits together with the job's progress, so a crash loses at most the
+    chunk in flight and a resumed run picks up from the anti-join again.
+    """
+    chunk_size = chunk_size or current_app.config.get("BILL_JOB_CHUNK_SIZE", 500)
+    job = db.session.get(BillGenerationJob, job_id)
+    start, end = period_bounds(job.period)
+    message = f"New monthly bills have been generated for {start.strftime('%B %Y')}."
+    try:
+        while True:
+            user_ids = _next_chunk(start, end, job.last_user_id, chunk_size)
+            if not user_ids:
+                break
+            now = datetime.utcnow()
+            created_at = period_timestamp(now, start, end)
+            bills = [
+                {
+                    "user_id": uid,
+                    "bill_type": bt,
+                    "amount_due": round(random.uniform(300, 1200), 2),
+                    "due_date": (now + timedelta(days=random.randint(5, 15))).date(),
+                    "status": "Pending",
+                    "created_at": created_at
+                }
+                for uid in user_ids for bt in BILL_TYPES
+            ]
+            db.session.execute(insert(Bill), bills)
+            add_notifications([
+                {"user_id": uid, "message": message, "created_at": now} for uid in user_ids
+            ])
+            add_rollups([entry for b in bills for entry in
+                         bill_created(b["bill_type"], b["amount_due"], b["due_date"], created_at)])
+            bump_version(user_ids, "bills", "notifications")
+            job.processed_users += len(user_ids)
+            job.bills_created += len(user_ids) * len(BILL_TYPES)
+            job.last_user_id = user_ids[-1]
+            job.heartbeat_at = now
+            db.session.commit()
+            publish_event(user_ids, "bill", {"period": job.period})
+            publish_event(user_ids, "notification", {"message": message})
+
+        job.status = "Completed"
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print("run_job error:", e)
+        job = db.session.get(BillGenerationJob, job_id)
+        job.status = "Failed"
+        job.error = str(e)[:255]
+        db.session.commit()
+    return job
+
+# ----------------------------------CLI Command-------------------------------------------
+@click.command("generate-bills")
+@click.option("--period", default=None, help="Billing month as YYYY-MM (defaults to the current month).")
+@click.option("--chunk-size", default=None, type=int, help="Users per committed chunk.")
+def generate_bills_command(period, chunk_size):
+    """Generate (or resume) monthly bills in the foreground."""
+    period = period or current_period()
+    try:
+        period_bounds(period)
+    except ValueError:
+        raise click.BadParameter("must be YYYY-MM", param_hint="--period")
+    if period > current_period():
+        raise click.BadParameter("cannot bill a future month", param_hint="--period")
+    job, claimed = claim_job(period)
+    if not claimed:
+        click.echo(f"Job {job.id} for {job.period} is already running "
+                   f"({job.processed_users}/{job.total_users} users).")
+        return
+    job = run_job(job.id, chunk_size)
+    click.echo(f"Job {job.id} {job.status}: {job.processed_users} users, {job.bills_created} bills.")
@@ -0,0 +1,90 @@
+# ----------------------------------File Header-------------------------------------------
+# dashboard_cache.py
+# Purpose: Bounded per-user cache of assembled dashboard sections with TTL and LRU eviction.
+
+# ----------------------------------Imports-------------------------------------------
+import time
+import threading
+from collections import OrderedDict
+from flask import current_app
+
+# ----------------------------------Dashboard Cache-------------------------------------------
+class DashboardCache:
+    """Process-local cache of dashboard sections keyed by user id.
+
+    Each section is stored with the section version it was built at. A lookup
+    only hits when that version still matches the shared ``DashboardVersion``
+    row, so a write committed by any gunicorn worker invalidates every other
+    worker's copy on its next read without any cross-process messaging.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id, section, version):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            cached = entry.get(section) if entry else None
+            if cached and cached[0] == version and cached[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, section, version, data):
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                entry = self._entries[user_id] = {}
+            entry[section] = (version, expires_at, data)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_ids, *sections):
+        with self._lock:
+            for uid in user_ids:
+                entry = self._entries.get(uid)
+                if entry is None:
+                    continue
+                if sections:
+                    for section in sections:
+                        entry.pop(section, None)
+                else:
+                    entry.clear()
+                if not entry:
+                    del self._entries[uid]
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+# ----------------------------------App Integration-------------------------------------------
+def init_dashboard_cache(app):
+    app.extensions["dashboard_cache"] = DashboardCache(
+        max_entries=app.config.get("DASHBOARD_CACHE_MAX_ENTRIES", 10000),
+        ttl_seconds=app.config.get("DASHBOARD_CACHE_TTL_SECONDS", 60)
+    )
+
+def get_dashboard_cache():
+    return current_app.extensions["dashboard_cache"]
@@ -0,0 +1,90 @@
+# ----------------------------------File Header-------------------------------------------
+# dashboard_versions.py
+# Purpose: Per-user change versions for the dashboard, used for ETags and delta responses.
+
+# ----------------------------------Imports-------------------------------------------
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import DashboardVersion
+from dashboard_cache import get_dashboard_cache
+from database import has_replica, use_replica
+
+# ----------------------------------Sections-------------------------------------------
+SECTIONS = ("profile", "bills", "transactions", "notifications")
+
+# ----------------------------------Bump Version-------------------------------------------
+def bump_version(user_ids, *sections):
+    """Stage a version bump for one or many users in the current transaction.
+
+    Every listed section (all of them when none are given) is stamped with the
+    new overall version, so a client holding version N only needs the sections
+    whose stamp is greater than N. Call this before ``db.session.commit()`` so
+    the bump lands atomically with the write it describes.
+    """
+    if isinstance(user_ids, int):
+        user_ids = [user_ids]
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    # Drop this worker's cached sections now; other workers see the new stamp on their next read.
+    get_dashboard_cache().invalidate(user_ids, *sections)
+    sections = sections or SECTIONS
+
+    next_version = DashboardVersion.version + 1
+    values = {"version": next_version}
+    for section in sections:
+        values[f"{section}_version"] = next_version
+    stmt = update(DashboardVersion).values(**values)
+
+    result = db.session.execute(stmt.where(DashboardVersion.user_id.in_(user_ids)))
+    if result.rowcount == len(user_ids):
+        return
+
+    existing = {
+        uid for (uid,) in db.session.query(DashboardVersion.user_id)
+                                    .filter(DashboardVersion.user_id.in_(user_ids))
+    }
+    missing = [uid for uid in user_ids if uid not in existing]
+    fresh = {f"{section}_version": 1 for section in sections}
+    for uid in missing:
+        try:
+            with db.session.begin_nested():
+                db.session.add(DashboardVersion(user_id=uid, version=1, **fresh))
+        except IntegrityError:
+            # Another worker created the row first; bump it instead.
+            db.session.execute(stmt.where(DashboardVersion.user_id == uid))
+
+# ----------------------------------Read Version-------------------------------------------
+def get_version(user_id):
+    row = db.session.get(DashboardVersion, user_id)
+    if row is None:
+        return DashboardVersion(user_id=user_id, version=0, profile_version=0, bills_version=0,
+                                transactions_version=0, notifications_version=0)
+    return row
+
+def read_sections_from_replica(row):
+    """Route section reads to the replica only once it has caught up with ``row``, read on the primary.
+
+    A client re-reads the dashboard right after a write (or an event push), so a
+    lagging replica would hand back the pre-write sections under the old ETag.
+    """
+    if not has_replica():
+        return False
+    use_replica()
+    replica_version = db.session.scalar(
+        select(DashboardVersion.version).where(DashboardVersion.user_id == row.user_id)
+    ) or 0
+    if replica_version < row.version:
+        use_replica(False)
+        return False
+    return True
+
+def changed_sections(row, since):
+    """Sections that changed after ``since``; all of them when the client has no usable version."""
+    if since is None or since > row.version:
+        return list(SECTIONS)
+    return [s for s in SECTIONS if getattr(row, f"{s}_version") > since]
+
+def dashboard_etag(row):
+    return f"dash-{row.user_id}-{row.version}"
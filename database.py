@@ -0,0 +1,142 @@
+# ----------------------------------File Header-------------------------------------------
+# database.py
+# Purpose: Engine profiles (SQLite pragmas or server-database pooling) and optional routing
+#          of read-only endpoints to a replica database.
+
+# ----------------------------------Imports-------------------------------------------
+import os
+import click
+from functools import wraps
+from flask import current_app, g, has_request_context
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from flask_sqlalchemy.session import Session
+
+# ----------------------------------Profiles-------------------------------------------
+PROFILES = ("auto", "sqlite", "server")
+SQLITE_SYNCHRONOUS = ("OFF", "NORMAL", "FULL", "EXTRA")
+REPLICA_BIND = "replica"
+
+def resolve_profile(config, uri=None):
+    """The profile for ``uri`` (the primary database by default); ``auto`` picks by URL backend."""
+    profile = config.get("DB_PROFILE", "auto")
+    if profile not in PROFILES:
+        raise ValueError(f"DB_PROFILE must be one of: {', '.join(PROFILES)}")
+    is_sqlite = make_url(uri or config["SQLALCHEMY_DATABASE_URI"]).get_backend_name() == "sqlite"
+    if profile == "auto":
+        return "sqlite" if is_sqlite else "server"
+    # The SQLite profile only makes sense for SQLite; a server profile on SQLite just pools connections.
+    return "sqlite" if profile == "sqlite" and is_sqlite else "server"
+
+def engine_options(config, uri=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured profile."""
+    if resolve_profile(config, uri) == "sqlite":
+        # Python's sqlite3 waits this long for a lock itself; busy_timeout covers the rest.
+        return {"connect_args": {"timeout": config.get("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000}}
+    return {
+        "pool_size": config.get("DB_POOL_SIZE", 10),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 20),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT_SECONDS", 10),
+        "pool_recycle": config.get("DB_POOL_RECYCLE_SECONDS", 1800),
+        "pool_pre_ping": True,
+    }
+
+def replica_binds(config):
+    """SQLALCHEMY_BINDS entry for DATABASE_REPLICA_URL; no models use it, so create_all and migrations ignore it."""
+    url = config.get("DATABASE_REPLICA_URL")
+    return {REPLICA_BIND: {"url": url, **engine_options(config, url)}} if url else {}
+
+def sqlite_pragmas(config):
+    synchronous = config.get("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+    if synchronous not in SQLITE_SYNCHRONOUS:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of: {', '.join(SQLITE_SYNCHRONOUS)}")
+    return {
+        # Readers no longer block the writer (and vice versa) across gunicorn workers.
+        "journal_mode": "WAL",
+        # With WAL, NORMAL only risks the last commits on power loss, never corruption.
+        "synchronous": synchronous,
+        "busy_timeout": int(config.get("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        "mmap_size": int(config.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    }
+
+def _apply_pragmas(engine, pragmas):
+    def on_connect(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    event.listen(engine, "connect", on_connect)
+
+def _configure(engine, config):
+    if resolve_profile(config, engine.url) == "sqlite":
+        _apply_pragmas(engine, sqlite_pragmas(config))
+
+# ----------------------------------Replica Routing-------------------------------------------
+class RoutingSession(Session):
+    """Sends reads to the replica engine while a ``@read_replica`` view is running.
+
+    Anything that flushes, and every request without the flag, stays on the
+    primary. Replica reads may lag behind the primary, so only mark views that
+    tolerate slightly stale data.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context() and g.get("_use_replica"):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def has_replica():
+    return REPLICA_BIND in current_app.extensions["sqlalchemy"].engines
+
+def use_replica(enabled=True):
+    """Send the rest of this request's reads to the replica (or back to the primary)."""
+    g._use_replica = enabled
+
+def read_replica(view):
+    """Route this view's queries to DATABASE_REPLICA_URL when one is configured."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        use_replica()
+        return view(*args, **kwargs)
+    return wrapper
+
+# ----------------------------------App Integration-------------------------------------------
+def init_database(app):
+    """Install connect-time pragmas on the primary and replica engines, and drop inherited pools after fork.
+
+    Call after ``db.init_app(app)`` so the engines exist.
+    """
+    with app.app_context():
+        engines = list(app.extensions["sqlalchemy"].engines.values())
+    for engine in engines:
+        _configure(engine, app.config)
+
+    def after_fork():
+        # Connections opened before a fork (e.g. gunicorn --preload) stay with the parent.
+        for engine in engines:
+            engine.dispose(close=False)
+    os.register_at_fork(after_in_child=after_fork)
+
+# ----------------------------------CLI Command-------------------------------------------
+def _describe(engine, config):
+    lines = [f"  url: {engine.url.render_as_string(hide_password=True)}",
+             f"  profile: {resolve_profile(config, engine.url)}"]
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            for name in sqlite_pragmas(config):
+                lines.append(f"  {name}: {conn.execute(text(f'PRAGMA {name}')).scalar()}")
+        else:
+            lines.append(f"  pool: {engine.pool.status()}")
+    return lines
+
+@click.command("db-profile")
+def db_profile_command():
+    """Show the effective engine settings of the primary and replica databases."""
+    engines = current_app.extensions["sqlalchemy"].engines
+    for key, engine in sorted(engines.items(), key=lambda item: item[0] is not None):
+        click.echo(f"{key or 'primary'}:")
+        click.echo("\n".join(_describe(engine, current_app.config)))
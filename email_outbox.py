@@ -0,0 +1,234 @@
+# ----------------------------------File Header-------------------------------------------
+# email_outbox.py
+# Purpose: Durable email outbox and the background pool that delivers it to Brevo.
+
+# ----------------------------------Imports-------------------------------------------
+import random
+import threading
+import uuid
+import click
+import requests
+from datetime import datetime, timedelta
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from sqlalchemy import update, delete, or_, and_
+from extensions import db
+from models import EmailOutbox
+from email_utils import brevo_settings, brevo_headers, render_otp_email
+from metrics import observe_outbound
+
+# ----------------------------------Settings-------------------------------------------
+CLAIM_TIMEOUT = timedelta(minutes=5)
+MAX_BACKOFF_SECONDS = 3600
+
+# ----------------------------------Enqueue-------------------------------------------
+def queue_otp_email(recipient_email, otp, expiry_minutes=5):
+    """Stage an OTP email in the current transaction; it is sent once the caller commits."""
+    subject, html = render_otp_email(otp, expiry_minutes)
+    db.session.add(EmailOutbox(recipient=recipient_email, subject=subject, html=html))
+
+def wake_email_pool():
+    pool = current_app.extensions.get("email_pool")
+    if pool:
+        pool.wake()
+
+# ----------------------------------Claim & Settle-------------------------------------------
+def claim_batch(limit):
+    """Atomically claim up to ``limit`` due messages for this worker.
+
+    The claim is a conditional UPDATE stamped with a fresh token, so several
+    threads or gunicorn workers can poll the same table without sending a
+    message twice. Messages stuck in Sending past ``CLAIM_TIMEOUT`` are
+    reclaimed, which covers a worker dying mid-delivery.
+    """
+    now = datetime.utcnow()
+    due = or_(
+        and_(EmailOutbox.status == "Pending", EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.status == "Sending", EmailOutbox.claimed_at < now - CLAIM_TIMEOUT)
+    )
+    ids = [i for (i,) in db.session.query(EmailOutbox.id).filter(due)
+                                   .order_by(EmailOutbox.id).limit(limit)]
+    if not ids:
+        db.session.rollback()
+        return []
+    token = uuid.uuid4().hex
+    db.session.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids), due)
+        .values(status="Sending", claim_token=token, claimed_at=now)
+    )
+    db.session.commit()
+    return EmailOutbox.query.filter_by(claim_token=token, status="Sending").all()
+
+def _mark_sent(rows):
+    now = datetime.utcnow()
+    for row in rows:
+        row.status = "Sent"
+        row.sent_at = now
+        row.claim_token = None
+        # The body (an OTP) is no longer needed once delivered; the row itself is purged later.
+        row.html = ""
+
+def _mark_failed(rows, error, retryable, max_attempts):
+    now = datetime.utcnow()
+    for row in rows:
+        row.attempts += 1
+        row.last_error = str(error)[:255]
+        row.claim_token = None
+        if not retryable or row.attempts >= max_attempts:
+            # Dead letters stay in the table for inspection and manual requeue.
+            row.status = "Dead"
+        else:
+            backoff = min(MAX_BACKOFF_SECONDS, 2 ** row.attempts * 5)
+            row.status = "Pending"
+            row.next_attempt_at = now + timedelta(seconds=backoff * random.uniform(0.8, 1.2))
+
+# ----------------------------------Purge-------------------------------------------
+def purge_email_outbox():
+    """Drop Sent rows older than EMAIL_SENT_RETENTION_DAYS and Dead rows older than
+    EMAIL_DEAD_RETENTION_DAYS; returns the row count."""
+    now = datetime.utcnow()
+    sent_cutoff = now - timedelta(days=current_app.config.get("EMAIL_SENT_RETENTION_DAYS", 7))
+    dead_cutoff = now - timedelta(days=current_app.config.get("EMAIL_DEAD_RETENTION_DAYS", 30))
+    result = db.session.execute(
+        delete(EmailOutbox).where(or_(
+            and_(EmailOutbox.status == "Sent", EmailOutbox.sent_at < sent_cutoff),
+            and_(EmailOutbox.status == "Dead", EmailOutbox.created_at < dead_cutoff)
+        ))
+    )
+    db.session.commit()
+    return result.rowcount
+
+# ----------------------------------Delivery-------------------------------------------
+def _post(http, settings, rows, timeout):
+    """Send rows in one Brevo call, one messageVersion per recipient."""
+    payload = {
+        "sender": {"name": settings["sender_name"], "email": settings["sender_email"]},
+        "subject": rows[0].subject,
+        "htmlContent": rows[0].html,
+        "messageVersions": [
+            {"to": [{"email": r.recipient}], "subject": r.subject, "htmlContent": r.html}
+            for r in rows
+        ]
+    }
+    with observe_outbound("brevo", "send_email") as call:
+        resp = http.post(settings["api_url"], headers=brevo_headers(settings["api_key"]),
+                         json=payload, timeout=timeout)
+        call["outcome"] = resp.status_code
+    return resp
+
+def deliver_batch(http, rows, timeout=10, max_attempts=6):
+    settings = brevo_settings()
+    if not settings["api_key"] or not settings["sender_email"]:
+        for r in rows:
+            print(f"[DEV] Email to {r.recipient}: {r.subject}\n{r.html}")
+        _mark_sent(rows)
+        db.session.commit()
+        return
+
+    try:
+        resp = _post(http, settings, rows, timeout)
+    except requests.RequestException as e:
+        _mark_failed(rows, e, True, max_attempts)
+        db.session.commit()
+        return
+
+    if resp.status_code in (200, 201, 202):
+        _mark_sent(rows)
+    elif resp.status_code == 429 or resp.status_code >= 500:
+        _mark_failed(rows, f"{resp.status_code} {resp.text}", True, max_attempts)
+    elif len(rows) > 1:
+        # A 4xx rejects the whole batch; retry one by one so a single bad address is isolated.
+        db.session.commit()
+        for r in rows:
+            deliver_batch(http, [r], timeout, max_attempts)
+        return
+    else:
+        _mark_failed(rows, f"{resp.status_code} {resp.text}", False, max_attempts)
+    db.session.commit()
+
+# ----------------------------------Delivery Pool-------------------------------------------
+class EmailDeliveryPool:
+    """Background threads that drain the outbox over keep-alive HTTP sessions."""
+
+    def __init__(self, app, workers=2, batch_size=50, poll_interval=1.0, timeout=10, max_attempts=6):
+        self.app = app
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def ensure_started(self):
+        """Start the worker threads once per process, on the first request it serves."""
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"email-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def wake(self):
+        self._wake.set()
+
+    def _session(self):
+        http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        http.mount("https://", adapter)
+        http.mount("http://", adapter)
+        return http
+
+    def _run(self):
+        http = self._session()
+        with self.app.app_context():
+            while True:
+                try:
+                    rows = claim_batch(self.batch_size)
+                    if rows:
+                        deliver_batch(http, rows, self.timeout, self.max_attempts)
+                        continue
+                except Exception as e:
+                    db.session.rollback()
+                    print("email worker error:", e)
+                finally:
+                    db.session.remove()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+# ----------------------------------App Integration-------------------------------------------
+def init_email_pool(app):
+    workers = app.config.get("EMAIL_WORKERS", 2)
+    if not workers:
+        return
+    pool = EmailDeliveryPool(
+        app,
+        workers=workers,
+        batch_size=app.config.get("EMAIL_BATCH_SIZE", 50),
+        poll_interval=app.config.get("EMAIL_POLL_INTERVAL", 1.0),
+        timeout=app.config.get("EMAIL_TIMEOUT", 10),
+        max_attempts=app.config.get("EMAIL_MAX_ATTEMPTS", 6)
+    )
+    app.extensions["email_pool"] = pool
+    app.before_request(pool.ensure_started)
+
+# ----------------------------------CLI Command-------------------------------------------
+@click.command("deliver-emails")
+def deliver_emails_command():
+    """Drain the email outbox once in the foreground."""
+    app = current_app
+    http = requests.Session()
+    sent = 0
+    while True:
+        rows = claim_batch(app.config.get("EMAIL_BATCH_SIZE", 50))
+        if not rows:
+            break
+        deliver_batch(http, rows, app.config.get("EMAIL_TIMEOUT", 10),
+                      app.config.get("EMAIL_MAX_ATTEMPTS", 6))
+        sent += len(rows)
+    click.echo(f"Processed {sent} outbox messages.")
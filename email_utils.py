@@ -5,27 +5,29 @@
 # ----------------------------------Imports-------------------------------------------
 import os
 import requests
+from metrics import observe_outbound
 
-# ----------------------------------Send OTP Email Function-------------------------------------------
-def send_otp_email(recipient_email: str, otp: str, expiry_minutes: int = 5) -> bool:
-    BREVO_API_KEY = os.getenv("BREVO_API_KEY")
-    MAIL_SENDER_NAME = os.getenv("MAIL_SENDER_NAME", "PaySub")
-    MAIL_SENDER_EMAIL = os.getenv("MAIL_SENDER_EMAIL")
+# ----------------------------------Brevo Settings-------------------------------------------
+DEFAULT_BREVO_API_URL = "https://api.brevo.com/v3/smtp/email"
 
-    # ----------------------------------Fallback for Development Mode-------------------------------------------
-    if not BREVO_API_KEY or not MAIL_SENDER_EMAIL:
-        print(f"[DEV] OTP for {recipient_email}: {otp} (expires in {expiry_minutes} minutes)")
-        return True
+def brevo_settings():
+    return {
+        "api_key": os.getenv("BREVO_API_KEY"),
+        "api_url": os.getenv("BREVO_API_URL", DEFAULT_BREVO_API_URL),
+        "sender_name": os.getenv("MAIL_SENDER_NAME", "PaySub"),
+        "sender_email": os.getenv("MAIL_SENDER_EMAIL")
+    }
 
-    # ----------------------------------Preparing Brevo API Request-------------------------------------------
-    url = "https://api.brevo.com/v3/smtp/email"
-    headers = {
+def brevo_headers(api_key):
+    return {
         "accept": "application/json",
-        "api-key": BREVO_API_KEY,
+        "api-key": api_key,
         "content-type": "application/json"
     }
 
-    # ----------------------------------Email Content-------------------------------------------
+# ----------------------------------Email Content-------------------------------------------
+def render_otp_email(otp: str, expiry_minutes: int = 5):
+    subject = "PaySub — Your verification code"
     html = f"""
     <div style="font-family: Arial, sans-serif; line-height:1.4;">
       <h3>Verify your PaySub account</h3>
@@ -34,15 +36,30 @@ def send_otp_email(recipient_email: str, otp: str, expiry_minutes: int = 5) -> b
       <p>If you did not request this, ignore this email.</p>
     </div>
     """
+    return subject, html
+
+# ----------------------------------Send OTP Email Function-------------------------------------------
+def send_otp_email(recipient_email: str, otp: str, expiry_minutes: int = 5) -> bool:
+    """Send one OTP email synchronously. Request handlers queue through email_outbox instead."""
+    settings = brevo_settings()
+
+    # ----------------------------------Fallback for Development Mode-------------------------------------------
+    if not settings["api_key"] or not settings["sender_email"]:
+        print(f"[DEV] OTP for {recipient_email}: {otp} (expires in {expiry_minutes} minutes)")
+        return True
 
     # ----------------------------------Sending Email Request-------------------------------------------
+    subject, html = render_otp_email(otp, expiry_minutes)
     payload = {
-        "sender": {"name": MAIL_SENDER_NAME, "email": MAIL_SENDER_EMAIL},
+        "sender": {"name": settings["sender_name"], "email": settings["sender_email"]},
         "to": [{"email": recipient_email}],
-        "subject": "PaySub — Your verification code",
+        "subject": subject,
         "htmlContent": html
     }
-    resp = requests.post(url, headers=headers, json=payload, timeout=10)
+    with observe_outbound("brevo", "send_email") as call:
+        resp = requests.post(settings["api_url"], headers=brevo_headers(settings["api_key"]),
+                             json=payload, timeout=10)
+        call["outcome"] = resp.status_code
     print("BREVO RESPONSE:", resp.status_code, resp.text)
 
     # ----------------------------------Return Status-------------------------------------------
@@ -0,0 +1,197 @@
+# ----------------------------------File Header-------------------------------------------
+# events.py
+# Purpose: In-process event hub that fans bill, payment and notification events out to
+#          open dashboard streams, with pluggable backends for cross-worker delivery.
+
+# ----------------------------------Imports-------------------------------------------
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+from flask import current_app
+
+# ----------------------------------Memory Backend-------------------------------------------
+class MemoryBackend:
+    """Single-process backend: events are dispatched straight to the local hub."""
+
+    def start(self, hub):
+        self.hub = hub
+
+    def publish(self, events):
+        for user_id, event, data in events:
+            self.hub.dispatch(user_id, event, data)
+
+# ----------------------------------SQLite Backend-------------------------------------------
+class SQLiteBackend:
+    """Cross-process backend backed by a small local SQLite file.
+
+    Every worker appends events to the same file and runs one poller thread
+    that reads rows past the last id it has seen and hands them to its own hub,
+    so a write handled by one gunicorn worker reaches streams held by the others.
+    """
+
+    def __init__(self, path, poll_interval=0.5, retention_seconds=300):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " user_id INTEGER NOT NULL,"
+            " event TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_events_created_at ON events (created_at)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # A forked worker must not reuse the connection its parent opened in __init__.
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def start(self, hub):
+        self.hub = hub
+
+    def publish(self, events):
+        now = time.time()
+        conn = self._conn()
+        conn.executemany(
+            "INSERT INTO events (user_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+            [(user_id, event, json.dumps(data), now) for user_id, event, data in events]
+        )
+        conn.commit()
+        # Pruned here as well as in the poller, so the file stays bounded in processes that never poll.
+        self._prune(conn)
+
+    def _prune(self, conn):
+        """Delete events older than the retention window, at most once a minute per process."""
+        with self._lock:
+            if time.monotonic() < self._next_prune:
+                return
+            self._next_prune = time.monotonic() + 60
+        conn.execute("DELETE FROM events WHERE created_at < ?", (time.time() - self.retention_seconds,))
+        conn.commit()
+
+    def ensure_polling(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._poll_loop, name="event-poller", daemon=True)
+            self._thread.start()
+
+    def _poll_loop(self):
+        conn = self._conn()
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        while True:
+            rows = []
+            try:
+                rows = conn.execute(
+                    "SELECT id, user_id, event, data FROM events WHERE id > ? ORDER BY id LIMIT 1000",
+                    (last_id,)
+                ).fetchall()
+                for row_id, user_id, event, data in rows:
+                    self.hub.dispatch(user_id, event, json.loads(data))
+                    last_id = row_id
+                self._prune(conn)
+            except sqlite3.Error as e:
+                print("event poller error:", e)
+            if not rows:
+                time.sleep(self.poll_interval)
+
+# ----------------------------------Event Hub-------------------------------------------
+class EventHub:
+    def __init__(self, backend, queue_size=100, max_connections=None):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        backend.start(self)
+
+    def subscribe(self, user_id):
+        """A new queue for ``user_id``, or None when this worker already holds max_connections streams."""
+        if hasattr(self.backend, "ensure_polling"):
+            self.backend.ensure_polling()
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if self.max_connections and self._count() >= self.max_connections:
+                return None
+            self._subscribers.setdefault(user_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            subs = self._subscribers.get(user_id)
+            if subs:
+                subs.discard(q)
+                if not subs:
+                    del self._subscribers[user_id]
+
+    def dispatch(self, user_id, event, data):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for q in subs:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                # A stalled client resyncs from its dashboard version on its next fetch.
+                pass
+
+    def publish(self, events):
+        if events:
+            self.backend.publish(events)
+
+    def _count(self):
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def connection_count(self):
+        with self._lock:
+            return self._count()
+
+# ----------------------------------App Integration-------------------------------------------
+def init_events(app):
+    backend_name = app.config.get("EVENT_BACKEND", "sqlite")
+    if backend_name == "memory":
+        backend = MemoryBackend()
+    elif backend_name == "sqlite":
+        path = app.config.get("EVENT_DB_PATH") or os.path.join(app.instance_path, "events.db")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        backend = SQLiteBackend(
+            path,
+            poll_interval=app.config.get("EVENT_POLL_INTERVAL", 0.5),
+            retention_seconds=app.config.get("EVENT_RETENTION_SECONDS", 300)
+        )
+    else:
+        raise ValueError(f"Unknown EVENT_BACKEND: {backend_name}")
+    app.extensions["event_hub"] = EventHub(
+        backend, max_connections=app.config.get("EVENT_STREAM_MAX_CONNECTIONS", 48)
+    )
+
+def get_hub():
+    return current_app.extensions["event_hub"]
+
+def publish_event(user_ids, event, data=None):
+    """Publish one event to one or many users. Call only after the write has been committed."""
+    if isinstance(user_ids, int):
+        user_ids = [user_ids]
+    try:
+        get_hub().publish([(uid, event, data or {}) for uid in user_ids])
+    except Exception as e:
+        # Streams are a latency optimisation; the dashboard version still records the change.
+        print("publish_event error:", e)
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,141 @@
+# ----------------------------------File Header-------------------------------------------
+# exports.py
+# Purpose: Stream a user's bills, payments or transactions as CSV or JSONL, optionally
+#          gzipped, reading the rows from the database in chunks.
+
+# ----------------------------------Imports-------------------------------------------
+import io
+import csv
+import json
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from extensions import db
+from models import Bill, Payment, Transaction
+from archive import ARCHIVES, archived_column, needs_archive, both_tiers
+
+# ----------------------------------Export Definitions-------------------------------------------
+def _date(value):
+    return value.isoformat() if value else ""
+
+def _day(value):
+    return value.strftime("%Y-%m-%d") if value else ""
+
+def _money(value):
+    return round(float(value or 0), 2)
+
+# kind -> (model, column exported newest first, [(header, column, formatter)])
+EXPORTS = {
+    "bills": (Bill, Bill.created_at, [
+        ("ID", Bill.id, None),
+        ("User ID", Bill.user_id, None),
+        ("Bill Type", Bill.bill_type, None),
+        ("Amount Due", Bill.amount_due, _money),
+        ("Due Date", Bill.due_date, _date),
+        ("Status", Bill.status, None),
+        ("Created At", Bill.created_at, _day),
+    ]),
+    "payments": (Payment, Payment.id, [
+        ("ID", Payment.id, None),
+        ("Plan", Payment.plan, None),
+        ("Amount", Payment.amount, _money),
+        ("Status", Payment.status, None),
+        ("Provider", Payment.provider, None),
+        ("Payment ID", Payment.payment_id, None),
+        ("Due Date", Payment.due_date, _date),
+        ("Created At", Payment.created_at, _date),
+    ]),
+    "transactions": (Transaction, Transaction.id, [
+        ("ID", Transaction.id, None),
+        ("Bill ID", Transaction.bill_id, None),
+        ("Amount", Transaction.amount, _money),
+        ("Method", Transaction.method, None),
+        ("Status", Transaction.status, None),
+        ("Created At", Transaction.created_at, _date),
+    ]),
+}
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+CHUNK_ROWS = 500
+
+# ----------------------------------Filters-------------------------------------------
+def parse_filters(args):
+    """Read ``from``/``to`` (inclusive YYYY-MM-DD) and ``status`` from query args.
+
+    Raises ValueError with a client-facing message on bad dates.
+    """
+    filters = {"status": args.get("status") or None, "start": None, "end": None}
+    for key, name in (("from", "start"), ("to", "end")):
+        raw = args.get(key)
+        if raw:
+            try:
+                filters[name] = datetime.strptime(raw, "%Y-%m-%d")
+            except ValueError:
+                raise ValueError(f"{key} must be YYYY-MM-DD")
+    if filters["end"] is not None:
+        filters["end"] += timedelta(days=1)
+    return filters
+
+def _tier_statement(kind, user_id, archived, start, end, status):
+    model, _, columns = EXPORTS[kind]
+    columns = [col for _, col, _ in columns]
+    if archived:
+        model, columns = ARCHIVES[model], [archived_column(col) for col in columns]
+    stmt = select(*columns).where(model.user_id == user_id)
+    if status:
+        stmt = stmt.where(model.status == status)
+    if start is not None:
+        stmt = stmt.where(model.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(model.created_at < end)
+    return stmt
+
+def export_statement(kind, user_id, start=None, end=None, status=None):
+    """Newest-first SELECT of the export, reading the archive tier too when the range reaches it."""
+    model, order_column, _ = EXPORTS[kind]
+    hot = _tier_statement(kind, user_id, False, start, end, status)
+    if not needs_archive(model, user_id, start):
+        return hot.order_by(order_column.desc())
+    cold = _tier_statement(kind, user_id, True, start, end, status)
+    return both_tiers(hot, cold, order_column.key)
+
+# ----------------------------------Streaming-------------------------------------------
+def _encode_rows(kind, rows, fmt):
+    """Yield text chunks, one per CHUNK_ROWS rows, in the requested format."""
+    _, _, columns = EXPORTS[kind]
+    headers = [h for h, _, _ in columns]
+    formatters = [f for _, _, f in columns]
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer:
+        writer.writerow(headers)
+
+    count = 0
+    for row in rows:
+        values = [f(v) if f else v for f, v in zip(formatters, row)]
+        if writer:
+            writer.writerow([f"{v:.2f}" if isinstance(v, float) else v for v in values])
+        else:
+            buf.write(json.dumps(dict(zip(headers, values)), ensure_ascii=False))
+            buf.write("\n")
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_export(kind, user_id, fmt="csv", gzip=False, **filters):
+    """Generator of response body chunks; run it under ``stream_with_context``."""
+    stmt = export_statement(kind, user_id, **filters).execution_options(yield_per=CHUNK_ROWS)
+    rows = db.session.execute(stmt)
+    chunks = (chunk.encode("utf-8") for chunk in _encode_rows(kind, rows, fmt))
+    return _gzip(chunks) if gzip else chunks
@@ -0,0 +1,27 @@
+# ----------------------------------File Header-------------------------------------------
+# gunicorn.conf.py
+# Purpose: Gunicorn settings. The app is imported and built once in the master (--preload)
+#          and every worker is warmed up before it accepts traffic.
+
+# ----------------------------------Imports-------------------------------------------
+import os
+
+# ----------------------------------Server Settings-------------------------------------------
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", 3))
+worker_class = "gthread"
+# Each open dashboard event stream holds one gthread thread while idle
+threads = int(os.getenv("GUNICORN_THREADS", 64))
+# Workers fork from an already-imported app, so starting or recycling one skips the imports.
+# Provider clients, DB pools and background threads are all created per process after the fork.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") not in ("0", "false", "False")
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+
+# ----------------------------------Hooks-------------------------------------------
+def post_worker_init(worker):
+    """Warm the worker up after it has loaded the app and before it starts accepting."""
+    if os.getenv("WARMUP_ON_START", "1") in ("0", "false", "False"):
+        return
+    from warmup import warm_up
+    warm_up(worker.wsgi)
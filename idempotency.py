@@ -0,0 +1,114 @@
+# ----------------------------------File Header-------------------------------------------
+# idempotency.py
+# Purpose: Idempotency-Key support for state-changing endpoints, so client retries and
+#          double-clicks replay the first response instead of repeating the work.
+
+# ----------------------------------Imports-------------------------------------------
+import hashlib
+from functools import wraps
+from datetime import datetime, timedelta
+from flask import request, jsonify, make_response, current_app
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import IdempotencyKey
+from user_cache import current_user_id
+
+# ----------------------------------Settings-------------------------------------------
+HEADER = "Idempotency-Key"
+# A key still "in progress" after this long belongs to a request that died; let a retry take it over.
+STALE_AFTER = timedelta(minutes=2)
+
+# ----------------------------------Key Lifecycle-------------------------------------------
+def _fingerprint():
+    body = request.get_data(cache=True) or b""
+    return hashlib.sha256(request.path.encode() + b"\n" + body).hexdigest()
+
+def _claim(user_id, key, fingerprint):
+    """Insert or take over the key row; returns (row, claimed)."""
+    now = datetime.utcnow()
+    try:
+        with db.session.begin_nested():
+            row = IdempotencyKey(user_id=user_id, key=key, request_hash=fingerprint, created_at=now)
+            db.session.add(row)
+        db.session.commit()
+        return row, True
+    except IntegrityError:
+        db.session.rollback()
+
+    row = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+    if row is None or row.status_code is not None or row.request_hash != fingerprint:
+        return row, False
+    taken = db.session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.id == row.id, IdempotencyKey.status_code.is_(None),
+               IdempotencyKey.created_at < now - STALE_AFTER)
+        .values(created_at=now)
+    )
+    db.session.commit()
+    return row, taken.rowcount == 1
+
+def _finish(row_id, resp):
+    if resp.status_code >= 500 or not resp.is_json:
+        # Nothing durable to replay; free the key so the client can retry.
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == row_id))
+    else:
+        db.session.execute(
+            update(IdempotencyKey).where(IdempotencyKey.id == row_id)
+                                  .values(status_code=resp.status_code,
+                                          response_body=resp.get_data(as_text=True))
+        )
+    db.session.commit()
+
+# ----------------------------------Decorator-------------------------------------------
+def idempotent(fn):
+    """Honour an optional ``Idempotency-Key`` header on a ``jwt_required`` route.
+
+    The first request with a key runs normally and its JSON response is stored
+    against (user, key). A repeat with the same body gets that response back
+    with ``Idempotent-Replay: true``; a repeat while the first is still running
+    gets 409, and reusing a key for a different request gets 422.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return fn(*args, **kwargs)
+        if len(key) > 64:
+            return jsonify({"error": f"{HEADER} must be at most 64 characters"}), 400
+        user_id = current_user_id()
+        row, claimed = _claim(user_id, key, _fingerprint())
+
+        if not claimed:
+            if row is None:
+                return jsonify({"error": "Idempotency key conflict, please retry"}), 409
+            if row.request_hash != _fingerprint():
+                return jsonify({"error": f"{HEADER} was already used for a different request"}), 422
+            if row.status_code is None:
+                return jsonify({"error": "A request with this idempotency key is in progress"}), 409
+            resp = current_app.response_class(row.response_body, status=row.status_code,
+                                              mimetype="application/json")
+            resp.headers["Idempotent-Replay"] = "true"
+            return resp
+
+        row_id = row.id
+        try:
+            resp = make_response(fn(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == row_id))
+            db.session.commit()
+            raise
+        _finish(row_id, resp)
+        return resp
+    return wrapper
+
+# ----------------------------------Purge-------------------------------------------
+def purge_idempotency_keys():
+    """Drop keys older than IDEMPOTENCY_KEY_TTL_SECONDS; returns the row count."""
+    ttl = current_app.config.get("IDEMPOTENCY_KEY_TTL_SECONDS", 86400)
+    result = db.session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.created_at < datetime.utcnow() - timedelta(seconds=ttl))
+    )
+    db.session.commit()
+    return result.rowcount
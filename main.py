@@ -5,20 +5,39 @@
 #----------------------------------Imports-------------------------------------------
 import os
 from datetime import timedelta
-from flask import Flask, render_template
+from flask import Flask, request
 from flask_cors import CORS
 from flask_migrate import Migrate
 from dotenv import load_dotenv
 from extensions import db, jwt, mail
+from database import engine_options, replica_binds, init_database, db_profile_command
 from auth_routes import auth_bp
+from events import init_events
+from dashboard_cache import init_dashboard_cache
+from user_cache import init_user_cache
+from token_blocklist import init_token_blocklist, purge_token_blocklist_command
+from password_hashing import init_password_hasher
+from bill_jobs import generate_bills_command
+from email_outbox import init_email_pool, deliver_emails_command, purge_email_outbox
+from payment_gateway import init_gateway
+from metrics import init_metrics
+from static_assets import init_static_assets, page_response
+from query_plans import check_query_plans_command
+from rollups import rebuild_rollups_command
+from penalties import notify_overdue_bills, notify_overdue_command
+from background import schedule_periodic
+from idempotency import purge_idempotency_keys
+from razorpay_webhooks import reconcile_pending_events, reconcile_webhooks_command
+from notifications import compact_notifications, compact_notifications_command
+from archive import archive_settled_records, archive_records_command
+from bill_import import import_bills_command
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import User
 
-#----------------------------------Loading Environment Variables-------------------------------------------
-load_dotenv() 
-
 #----------------------------------Flask App Factory-------------------------------------------
 def create_app():
+    # Loaded here rather than at import so importing main stays side-effect free
+    load_dotenv()
     app = Flask(__name__, static_folder="static", template_folder="templates")
 
 # ----------------------------------App Configuration-------------------------------------------
@@ -26,18 +45,112 @@ def create_app():
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev-jwt-secret-change')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///users.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DB_PROFILE'] = os.getenv('DB_PROFILE', 'auto')
+    app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE', 268435456))
+    app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 10))
+    app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    app.config['DB_POOL_TIMEOUT_SECONDS'] = int(os.getenv('DB_POOL_TIMEOUT_SECONDS', 10))
+    app.config['DB_POOL_RECYCLE_SECONDS'] = int(os.getenv('DB_POOL_RECYCLE_SECONDS', 1800))
+    app.config['DATABASE_REPLICA_URL'] = os.getenv('DATABASE_REPLICA_URL')
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(app.config)
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(
         minutes=int(os.getenv('ACCESS_TOKEN_EXPIRES_MINUTES', 180))
     )
     app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(
         days=int(os.getenv('REFRESH_TOKEN_EXPIRES_DAYS', 7))
     )
+    app.config['TRANSACTIONS_PAGE_SIZE'] = int(os.getenv('TRANSACTIONS_PAGE_SIZE', 20))
+    app.config['TRANSACTIONS_MAX_PAGE_SIZE'] = int(os.getenv('TRANSACTIONS_MAX_PAGE_SIZE', 100))
+    app.config['DASHBOARD_CACHE_MAX_ENTRIES'] = int(os.getenv('DASHBOARD_CACHE_MAX_ENTRIES', 10000))
+    app.config['DASHBOARD_CACHE_TTL_SECONDS'] = int(os.getenv('DASHBOARD_CACHE_TTL_SECONDS', 60))
+    app.config['USER_CACHE_MAX_ENTRIES'] = int(os.getenv('USER_CACHE_MAX_ENTRIES', 10000))
+    app.config['USER_CACHE_TTL_SECONDS'] = int(os.getenv('USER_CACHE_TTL_SECONDS', 300))
+    app.config['TOKEN_BLOCKLIST_REFRESH_SECONDS'] = int(os.getenv('TOKEN_BLOCKLIST_REFRESH_SECONDS', 5))
+    app.config['TOKEN_BLOCKLIST_PURGE_SECONDS'] = int(os.getenv('TOKEN_BLOCKLIST_PURGE_SECONDS', 3600))
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+    app.config['OVERDUE_CHECK_INTERVAL_SECONDS'] = int(os.getenv('OVERDUE_CHECK_INTERVAL_SECONDS', 3600))
+    app.config['IDEMPOTENCY_KEY_TTL_SECONDS'] = int(os.getenv('IDEMPOTENCY_KEY_TTL_SECONDS', 86400))
+    app.config['BILL_JOB_CHUNK_SIZE'] = int(os.getenv('BILL_JOB_CHUNK_SIZE', 500))
+    app.config['EMAIL_WORKERS'] = int(os.getenv('EMAIL_WORKERS', 2))
+    app.config['EMAIL_BATCH_SIZE'] = int(os.getenv('EMAIL_BATCH_SIZE', 50))
+    app.config['EMAIL_MAX_ATTEMPTS'] = int(os.getenv('EMAIL_MAX_ATTEMPTS', 6))
+    app.config['EMAIL_TIMEOUT'] = float(os.getenv('EMAIL_TIMEOUT', 10))
+    app.config['EMAIL_SENT_RETENTION_DAYS'] = int(os.getenv('EMAIL_SENT_RETENTION_DAYS', 7))
+    app.config['EMAIL_DEAD_RETENTION_DAYS'] = int(os.getenv('EMAIL_DEAD_RETENTION_DAYS', 30))
+    app.config['RAZORPAY_KEY_ID'] = os.getenv('RAZORPAY_KEY_ID', 'rzp_test_RbDp1J1gZzApDr')
+    app.config['RAZORPAY_KEY_SECRET'] = os.getenv('RAZORPAY_KEY_SECRET', 'jq2LiXt7vEpgeL2zcdWbAAVp')
+    app.config['RAZORPAY_BASE_URL'] = os.getenv('RAZORPAY_BASE_URL')
+    app.config['RAZORPAY_CONNECT_TIMEOUT'] = float(os.getenv('RAZORPAY_CONNECT_TIMEOUT', 3.05))
+    app.config['RAZORPAY_READ_TIMEOUT'] = float(os.getenv('RAZORPAY_READ_TIMEOUT', 10))
+    app.config['RAZORPAY_POOL_SIZE'] = int(os.getenv('RAZORPAY_POOL_SIZE', 10))
+    app.config['RAZORPAY_BREAKER_THRESHOLD'] = int(os.getenv('RAZORPAY_BREAKER_THRESHOLD', 5))
+    app.config['RAZORPAY_BREAKER_RESET_SECONDS'] = int(os.getenv('RAZORPAY_BREAKER_RESET_SECONDS', 30))
+    app.config['RAZORPAY_ORDER_TTL_SECONDS'] = int(os.getenv('RAZORPAY_ORDER_TTL_SECONDS', 900))
+    app.config['NOTIFICATION_KEEP_PER_USER'] = int(os.getenv('NOTIFICATION_KEEP_PER_USER', 200))
+    app.config['NOTIFICATION_RETENTION_DAYS'] = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+    app.config['NOTIFICATION_COMPACT_INTERVAL_SECONDS'] = int(os.getenv('NOTIFICATION_COMPACT_INTERVAL_SECONDS', 3600))
+    app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+    app.config['ARCHIVE_CHUNK_SIZE'] = int(os.getenv('ARCHIVE_CHUNK_SIZE', 1000))
+    app.config['ARCHIVE_INTERVAL_SECONDS'] = int(os.getenv('ARCHIVE_INTERVAL_SECONDS', 86400))
+    app.config['BILL_IMPORT_CHUNK_SIZE'] = int(os.getenv('BILL_IMPORT_CHUNK_SIZE', 1000))
+    app.config['BILL_IMPORT_MAX_ERRORS'] = int(os.getenv('BILL_IMPORT_MAX_ERRORS', 1000))
+    app.config['BILL_BATCH_MAX_ITEMS'] = int(os.getenv('BILL_BATCH_MAX_ITEMS', 1000))
+    app.config['RAZORPAY_WEBHOOK_SECRET'] = os.getenv('RAZORPAY_WEBHOOK_SECRET')
+    app.config['RAZORPAY_WEBHOOK_BATCH_SIZE'] = int(os.getenv('RAZORPAY_WEBHOOK_BATCH_SIZE', 100))
+    app.config['RAZORPAY_RECONCILE_INTERVAL_SECONDS'] = int(os.getenv('RAZORPAY_RECONCILE_INTERVAL_SECONDS', 5))
+    app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', '1') not in ('0', 'false', 'False')
+    app.config['METRICS_SLOW_REQUEST_MS'] = int(os.getenv('METRICS_SLOW_REQUEST_MS', 500))
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+    app.config['METRICS_PUBLIC'] = os.getenv('METRICS_PUBLIC', '0') not in ('0', 'false', 'False')
+    app.config['EVENT_BACKEND'] = os.getenv('EVENT_BACKEND', 'sqlite')
+    app.config['EVENT_DB_PATH'] = os.getenv('EVENT_DB_PATH')
+    app.config['EVENT_STREAM_HEARTBEAT_SECONDS'] = int(os.getenv('EVENT_STREAM_HEARTBEAT_SECONDS', 15))
+    app.config['EVENT_STREAM_MAX_SECONDS'] = int(os.getenv('EVENT_STREAM_MAX_SECONDS', 300))
+    # Per worker; each stream holds a gthread thread, so keep this below GUNICORN_THREADS.
+    app.config['EVENT_STREAM_MAX_CONNECTIONS'] = int(os.getenv('EVENT_STREAM_MAX_CONNECTIONS', 48))
 
 # ----------------------------------Initializing Extensions-------------------------------------------
     db.init_app(app)
+    init_database(app)
     jwt.init_app(app)
     mail.init_app(app)
-    migrate = Migrate(app, db)
+    migrate = Migrate(app, db, render_as_batch=True)
+    init_events(app)
+    init_dashboard_cache(app)
+    init_user_cache(app)
+    init_token_blocklist(app)
+    init_password_hasher(app)
+    init_email_pool(app)
+    init_gateway(app)
+    init_metrics(app)
+    schedule_periodic(app, notify_overdue_bills, app.config['OVERDUE_CHECK_INTERVAL_SECONDS'],
+                      name="notify-overdue")
+    schedule_periodic(app, purge_idempotency_keys, 3600, name="purge-idempotency-keys")
+    schedule_periodic(app, purge_email_outbox, 3600, name="purge-email-outbox")
+    schedule_periodic(app, reconcile_pending_events, app.config['RAZORPAY_RECONCILE_INTERVAL_SECONDS'],
+                      name="razorpay-reconciler")
+    schedule_periodic(app, compact_notifications, app.config['NOTIFICATION_COMPACT_INTERVAL_SECONDS'],
+                      name="compact-notifications")
+    schedule_periodic(app, archive_settled_records, app.config['ARCHIVE_INTERVAL_SECONDS'],
+                      name="archive-records")
+
+#----------------------------------CLI Commands-------------------------------------------
+    app.cli.add_command(generate_bills_command)
+    app.cli.add_command(deliver_emails_command)
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(purge_token_blocklist_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(notify_overdue_command)
+    app.cli.add_command(reconcile_webhooks_command)
+    app.cli.add_command(compact_notifications_command)
+    app.cli.add_command(archive_records_command)
+    app.cli.add_command(import_bills_command)
+    app.cli.add_command(db_profile_command)
 
 #----------------------------------CORS Configuration-------------------------------------------
     CORS(
@@ -52,9 +165,15 @@ def create_app():
 #----------------------------------Adding Security Headers-------------------------------------------
     @app.after_request
     def add_security_headers(resp):
-        resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        resp.headers['Pragma'] = 'no-cache'
-        resp.headers['Expires'] = '0'
+        if request.blueprint == 'auth_bp' or 'Authorization' in request.headers:
+            # API responses carry tokens or per-user data
+            if 'ETag' in resp.headers:
+                # Validated responses may sit in the private cache but must be revalidated on every use
+                resp.headers['Cache-Control'] = 'private, no-cache'
+            else:
+                resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+                resp.headers['Pragma'] = 'no-cache'
+                resp.headers['Expires'] = '0'
         resp.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
         resp.headers['X-Content-Type-Options'] = 'nosniff'
         resp.headers['X-Frame-Options'] = 'DENY'
@@ -64,15 +183,18 @@ def create_app():
 #----------------------------------Frontend Routes-------------------------------------------
     @app.route('/')
     def index():
-        return render_template('index.html')
+        return page_response('index.html')
 
     @app.route('/dashboard')
     def dashboard():
-        return render_template('dashboard.html')
+        return page_response('dashboard.html')
 
     @app.route('/admin_dashboard')
     def admin_dashboard():
-        return render_template('admin_dashboard.html')
+        return page_response('admin_dashboard.html')
+
+#----------------------------------Static Assets-------------------------------------------
+    init_static_assets(app, pages=['index.html', 'dashboard.html', 'admin_dashboard.html'])
 
     return app
 
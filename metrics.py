@@ -0,0 +1,294 @@
+# ----------------------------------File Header-------------------------------------------
+# metrics.py
+# Purpose: In-process request, SQL and outbound-call metrics, a slow-request log with the
+#          queries behind it, and a Prometheus text endpoint that never touches the database.
+
+# ----------------------------------Imports-------------------------------------------
+import time
+import hmac
+import threading
+from contextlib import contextmanager
+from flask import Blueprint, Response, request, g, current_app, has_app_context, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ----------------------------------Settings-------------------------------------------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Statements kept per request for the slow-request log; all of them are still counted.
+MAX_TRACED_QUERIES = 100
+
+# ----------------------------------Metric Types-------------------------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    def __init__(self, name, description, labelnames=()):
+        self.name, self.description, self.labelnames = name, description, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, description, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.description, self.labelnames = name, description, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = ("le", _number(bound))
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {count}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, ('le', '+Inf'))} {series[-2]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-2]}")
+        return lines
+
+# ----------------------------------Registry-------------------------------------------
+class MetricsRegistry:
+    """Everything this process has measured.
+
+    Each gunicorn worker keeps its own registry, so scrape every worker (or run
+    one worker per port) rather than reading a single worker as the whole app.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.requests = Counter("http_requests_total", "HTTP requests by endpoint, method and status.",
+                                ("endpoint", "method", "status"))
+        self.request_seconds = Histogram("http_request_duration_seconds",
+                                         "Time from request start to the last byte of the response.",
+                                         ("endpoint", "method"))
+        self.request_queries = Histogram("http_request_db_queries", "SQL statements issued per request.",
+                                         ("endpoint",), QUERY_COUNT_BUCKETS)
+        self.request_db_seconds = Histogram("http_request_db_seconds", "Time spent in SQL per request.",
+                                            ("endpoint",))
+        self.slow_requests = Counter("http_slow_requests_total", "Requests slower than METRICS_SLOW_REQUEST_MS.",
+                                     ("endpoint",))
+        self.query_seconds = Histogram("db_query_duration_seconds",
+                                       "SQL statement latency, including background jobs.", ("statement",))
+        self.outbound_seconds = Histogram("outbound_request_duration_seconds",
+                                          "Calls to external providers by service, operation and outcome.",
+                                          ("service", "operation", "outcome"))
+        self._collectors = []
+
+    def add_collector(self, fn):
+        """Register ``fn() -> [(name, type, description, {labels} or None, value)]``, evaluated at scrape time."""
+        self._collectors.append(fn)
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.request_seconds, self.request_queries, self.request_db_seconds,
+                       self.slow_requests, self.query_seconds, self.outbound_seconds):
+            lines += metric.render()
+        lines += ["# HELP process_start_time_seconds Start time of this worker since the epoch.",
+                  "# TYPE process_start_time_seconds gauge",
+                  f"process_start_time_seconds {self.started_at:.3f}"]
+        declared = set()
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                print("metrics collector error:", e)
+                continue
+            for name, kind, description, labels, value in samples:
+                if name not in declared:
+                    lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+                    declared.add(name)
+                labels = labels or {}
+                lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+def get_metrics():
+    return current_app.extensions["metrics"]
+
+def _registry():
+    return current_app.extensions.get("metrics") if has_app_context() else None
+
+# ----------------------------------Request Tracing-------------------------------------------
+class RequestTrace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.queries = []
+        self.outbound = []
+
+def _current_trace():
+    return g.get("_metrics_trace") if has_request_context() else None
+
+def _statement_kind(statement):
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("_metrics_started")
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    registry = _registry()
+    if registry is None:
+        return
+    registry.query_seconds.observe(elapsed, _statement_kind(statement))
+    trace = _current_trace()
+    if trace is not None:
+        trace.query_count += 1
+        trace.db_seconds += elapsed
+        if len(trace.queries) < MAX_TRACED_QUERIES:
+            trace.queries.append((elapsed, statement))
+
+def _handle_error(context):
+    # after_cursor_execute never fires for a failed statement; drop its start time so the
+    # next statement on this pooled connection is not timed against it.
+    conn = context.connection
+    stack = conn.info.get("_metrics_started") if conn is not None else None
+    if stack:
+        stack.pop()
+
+@contextmanager
+def observe_outbound(service, operation):
+    """Time a call to an external provider; set ``call["outcome"]`` (e.g. the HTTP status) inside."""
+    call = {"outcome": "ok"}
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call["outcome"] = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        registry = _registry()
+        if registry is not None:
+            registry.outbound_seconds.observe(elapsed, service, operation, str(call["outcome"]))
+        trace = _current_trace()
+        if trace is not None:
+            trace.outbound.append((elapsed, service, operation, call["outcome"]))
+
+# ----------------------------------Middleware-------------------------------------------
+def _start_trace():
+    g._metrics_trace = RequestTrace()
+
+def _finish_trace(app, registry, trace, endpoint, method, path, status, streaming):
+    elapsed = time.perf_counter() - trace.started
+    registry.requests.inc(endpoint, method, str(status))
+    registry.request_seconds.observe(elapsed, endpoint, method)
+    registry.request_queries.observe(trace.query_count, endpoint)
+    registry.request_db_seconds.observe(trace.db_seconds, endpoint)
+
+    threshold = app.config.get("METRICS_SLOW_REQUEST_MS", 500)
+    if streaming or not threshold or elapsed * 1000 < threshold:
+        return
+    registry.slow_requests.inc(endpoint)
+    lines = [f"slow request: {method} {path} -> {status} in {elapsed * 1000:.0f}ms, "
+             f"{trace.query_count} queries ({trace.db_seconds * 1000:.0f}ms)"]
+    for seconds, service, operation, outcome in trace.outbound:
+        lines.append(f"  {seconds * 1000:8.1f}ms  {service}.{operation} -> {outcome}")
+    for seconds, statement in trace.queries:
+        lines.append(f"  {seconds * 1000:8.1f}ms  " + " ".join(statement.split())[:300])
+    if trace.query_count > len(trace.queries):
+        lines.append(f"  ... {trace.query_count - len(trace.queries)} more queries")
+    print("\n".join(lines))
+
+def _record_response(resp):
+    trace = g.get("_metrics_trace")
+    if trace is None:
+        return resp
+    app = current_app._get_current_object()
+    registry = app.extensions["metrics"]
+    args = (app, registry, trace, request.endpoint or "unmatched", request.method, request.path,
+            resp.status_code, resp.mimetype == "text/event-stream")
+    if resp.is_streamed:
+        # Exports stream after this hook returns; finish timing once the last chunk is sent.
+        resp.call_on_close(lambda: _finish_trace(*args))
+    else:
+        _finish_trace(*args)
+    return resp
+
+# ----------------------------------Endpoint-------------------------------------------
+metrics_bp = Blueprint("metrics_bp", __name__)
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied, token):
+            return Response("unauthorized\n", status=401, mimetype="text/plain")
+    elif not current_app.config.get("METRICS_PUBLIC", False):
+        # Without a token the endpoint stays closed unless it was opened on purpose.
+        return Response("forbidden: set METRICS_TOKEN or METRICS_PUBLIC=1\n", status=403, mimetype="text/plain")
+    return Response(get_metrics().render(), mimetype="text/plain; version=0.0.4")
+
+# ----------------------------------App Integration-------------------------------------------
+def _cache_collector(app):
+    def collect():
+        samples = []
+        for name, key in (("dashboard", "dashboard_cache"), ("user", "user_cache")):
+            cache = app.extensions.get(key)
+            if cache is None or not hasattr(cache, "stats"):
+                continue
+            stats = cache.stats()
+            for field in ("hits", "misses", "evictions"):
+                if field in stats:
+                    samples.append((f"cache_{field}_total", "counter", f"Cache {field} by cache.",
+                                    {"cache": name}, stats[field]))
+            if "entries" in stats:
+                samples.append(("cache_entries", "gauge", "Entries currently cached.", {"cache": name},
+                                stats["entries"]))
+        gateway = app.extensions.get("razorpay")
+        if gateway is not None:
+            samples.append(("razorpay_circuit_open", "gauge", "1 while the Razorpay circuit breaker is open.",
+                            None, 1 if gateway.breaker.state == "open" else 0))
+        return samples
+    return collect
+
+def init_metrics(app):
+    """Install the timing middleware, SQL hooks and the /metrics blueprint."""
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    registry = MetricsRegistry()
+    registry.add_collector(_cache_collector(app))
+    app.extensions["metrics"] = registry
+    app.before_request(_start_trace)
+    app.after_request(_record_response)
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+    app.register_blueprint(metrics_bp)
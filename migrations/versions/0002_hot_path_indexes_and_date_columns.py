@@ -0,0 +1,162 @@
+"""hot path indexes and date columns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 07:02:51.059487
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def _change_due_date_type(table, old_type, new_type):
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('due_date',
+                   existing_type=old_type,
+                   type_=new_type,
+                   existing_nullable=True,
+                   postgresql_using=f'due_date::{new_type.compile(dialect=bind.dialect)}')
+        return
+
+    # SQLite batch mode rebuilds the table with CAST(due_date AS DATE), which keeps only
+    # the year. SQLAlchemy already stores Date as ISO text there, so park the text in a
+    # side column across the rebuild and copy it back unchanged.
+    op.add_column(table, sa.Column('due_date_iso', sa.String(length=20), nullable=True))
+    op.execute(f"UPDATE {table} SET due_date_iso = due_date")
+    with op.batch_alter_table(table, schema=None) as batch_op:
+        batch_op.alter_column('due_date',
+               existing_type=old_type,
+               type_=new_type,
+               existing_nullable=True)
+    op.execute(f"UPDATE {table} SET due_date = due_date_iso")
+    with op.batch_alter_table(table, schema=None) as batch_op:
+        batch_op.drop_column('due_date_iso')
+
+
+def upgrade():
+    # Tables introduced alongside this revision; 0001 is the schema as it stood before them.
+    op.create_table('bill_generation_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=7), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total_users', sa.Integer(), nullable=False),
+    sa.Column('processed_users', sa.Integer(), nullable=False),
+    sa.Column('bills_created', sa.Integer(), nullable=False),
+    sa.Column('last_user_id', sa.Integer(), nullable=False),
+    sa.Column('error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('period')
+    )
+    op.create_table('email_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipient', sa.String(length=160), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('html', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('claimed_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_email_outbox_status'), ['status'], unique=False)
+
+    op.create_table('dashboard_version',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('profile_version', sa.Integer(), nullable=False),
+    sa.Column('bills_version', sa.Integer(), nullable=False),
+    sa.Column('transactions_version', sa.Integer(), nullable=False),
+    sa.Column('notifications_version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('payment_order',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('bill_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('amount_paise', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.String(length=64), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['bill_id'], ['bill.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('order_id')
+    )
+    with op.batch_alter_table('payment_order', schema=None) as batch_op:
+        batch_op.create_index('ix_payment_order_bill_amount', ['bill_id', 'amount_paise'], unique=False)
+
+
+    # The string columns used '0000-00-00' as a placeholder, which is not a valid date.
+    op.execute("UPDATE payment SET due_date = NULL WHERE due_date IN ('0000-00-00', '')")
+    op.execute("UPDATE bill SET due_date = NULL WHERE due_date IN ('0000-00-00', '')")
+
+    _change_due_date_type('bill', sa.VARCHAR(length=20), sa.Date())
+    _change_due_date_type('payment', sa.VARCHAR(length=20), sa.Date())
+
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.create_index('ix_bill_status_due_date', ['status', 'due_date'], unique=False)
+        batch_op.create_index('ix_bill_user_status_created', ['user_id', 'status', 'created_at'], unique=False)
+        batch_op.create_index('ix_bill_user_status_due_date', ['user_id', 'status', 'due_date'], unique=False)
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_user_created', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_payment_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.create_index('ix_transaction_user_id_id', ['user_id', 'id'], unique=False)
+
+    with op.batch_alter_table('user_profile', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_profile_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_profile', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_profile_user_id'))
+
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.drop_index('ix_transaction_user_id_id')
+
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payment_user_id'))
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_user_created')
+
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.drop_index('ix_bill_user_status_due_date')
+        batch_op.drop_index('ix_bill_user_status_created')
+        batch_op.drop_index('ix_bill_status_due_date')
+
+    _change_due_date_type('payment', sa.Date(), sa.VARCHAR(length=20))
+    _change_due_date_type('bill', sa.Date(), sa.VARCHAR(length=20))
+
+    with op.batch_alter_table('payment_order', schema=None) as batch_op:
+        batch_op.drop_index('ix_payment_order_bill_amount')
+
+    op.drop_table('payment_order')
+    op.drop_table('dashboard_version')
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_email_outbox_status'))
+
+    op.drop_table('email_outbox')
+    op.drop_table('bill_generation_job')
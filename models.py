@@ -18,12 +18,14 @@ class User(db.Model):
 class TokenBlocklist(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(36), nullable=False, unique=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+    # When the revoked token would have expired anyway; NULL for rows written before it was tracked
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
 
 # ------------------ USER PROFILE ------------------
 class UserProfile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     name = db.Column(db.String(100))
     plan = db.Column(db.String(50), default="Free")
     balance = db.Column(db.Float, default=0.0)
@@ -34,38 +36,187 @@ class UserProfile(db.Model):
 # ------------------ PAYMENT HISTORY ------------------
 class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     plan = db.Column(db.String(50))
     amount = db.Column(db.Float)
     status = db.Column(db.String(20), default="None")
     provider = db.Column(db.String(50), default="Utility Service")
-    payment_id = db.Column(db.String(100), nullable=True)
-    due_date = db.Column(db.String(20), default="0000-00-00")
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    payment_id = db.Column(db.String(100), nullable=True, index=True)
+    due_date = db.Column(db.Date, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 # ------------------ NOTIFICATIONS ------------------
 class Notification(db.Model):
+    __table_args__ = (
+        db.Index('ix_notification_user_created', 'user_id', 'created_at'),
+        db.Index('ix_notification_user_id_id', 'user_id', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     message = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime, nullable=True)
+
+class NotificationCounter(db.Model):
+    # Maintained alongside every Notification insert, read and delete so the unread badge never counts rows.
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
 
 # ------------------ BILLS ------------------
 class Bill(db.Model):
+    __table_args__ = (
+        db.Index('ix_bill_user_status_created', 'user_id', 'status', 'created_at'),
+        db.Index('ix_bill_user_status_due_date', 'user_id', 'status', 'due_date'),
+        db.Index('ix_bill_status_due_date', 'status', 'due_date'),
+        db.Index('ux_bill_external_ref', 'external_ref', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     bill_type = db.Column(db.String(50)) 
     amount_due = db.Column(db.Float)
-    due_date = db.Column(db.String(20))
+    due_date = db.Column(db.Date)
     status = db.Column(db.String(20), default="Pending")
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    overdue_notified = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
+    # Provider's reference for imported bills; makes re-importing the same file a no-op.
+    external_ref = db.Column(db.String(100), nullable=True)
 
 # ------------------ TRANSACTIONS ------------------
 class Transaction(db.Model):
+    __table_args__ = (db.Index('ix_transaction_user_id_id', 'user_id', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     bill_id = db.Column(db.Integer, db.ForeignKey('bill.id'))
     amount = db.Column(db.Float)
     method = db.Column(db.String(30))
     status = db.Column(db.String(20), default="Success")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+# ------------------ DASHBOARD VERSION ------------------
+class DashboardVersion(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    profile_version = db.Column(db.Integer, default=0, nullable=False)
+    bills_version = db.Column(db.Integer, default=0, nullable=False)
+    transactions_version = db.Column(db.Integer, default=0, nullable=False)
+    notifications_version = db.Column(db.Integer, default=0, nullable=False)
+
+# ------------------ BILL GENERATION JOB ------------------
+class BillGenerationJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(7), unique=True, nullable=False)
+    status = db.Column(db.String(20), default="Queued", nullable=False)
+    total_users = db.Column(db.Integer, default=0, nullable=False)
+    processed_users = db.Column(db.Integer, default=0, nullable=False)
+    bills_created = db.Column(db.Integer, default=0, nullable=False)
+    last_user_id = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+# ------------------ EMAIL OUTBOX ------------------
+class EmailOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(160), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default="Pending", nullable=False, index=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(32), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+# ------------------ PAYMENT ORDERS ------------------
+class PaymentOrder(db.Model):
+    __table_args__ = (
+        db.Index('ix_payment_order_bill_amount', 'bill_id', 'amount_paise'),
+        # At most one open (being created or awaiting payment) order per bill and amount.
+        db.Index('ux_payment_order_open', 'bill_id', 'amount_paise', unique=True,
+                 sqlite_where=db.text("status IN ('Creating', 'Created')"),
+                 postgresql_where=db.text("status IN ('Creating', 'Created')")),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    bill_id = db.Column(db.Integer, db.ForeignKey('bill.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    amount_paise = db.Column(db.Integer, nullable=False)
+    order_id = db.Column(db.String(64), unique=True, nullable=False)
+    status = db.Column(db.String(20), default="Created", nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# ------------------ ANALYTICS ROLLUP ------------------
+class AnalyticsRollup(db.Model):
+    metric = db.Column(db.String(20), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)
+    dimension = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    amount = db.Column(db.Float, default=0.0, nullable=False)
+
+# ------------------ IDEMPOTENCY KEYS ------------------
+class IdempotencyKey(db.Model):
+    __table_args__ = (db.UniqueConstraint('user_id', 'key', name='uq_idempotency_key_user_key'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+# ------------------ RAZORPAY WEBHOOK INBOX ------------------
+class WebhookEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(64), unique=True, nullable=True)
+    event = db.Column(db.String(50), nullable=False)
+    payment_id = db.Column(db.String(100), nullable=True, index=True)
+    order_id = db.Column(db.String(64), nullable=True)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default="Pending", nullable=False, index=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    claim_token = db.Column(db.String(32), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+# ------------------ ARCHIVE TIER ------------------
+# Settled rows moved out of the hot tables by archive.py. Ids are kept, and there are no
+# foreign keys, so the tier can later move to its own database unchanged.
+class ArchivedBill(db.Model):
+    __table_args__ = (db.Index('ix_archived_bill_user_created', 'user_id', 'created_at'),)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer)
+    bill_type = db.Column(db.String(50))
+    amount_due = db.Column(db.Float)
+    due_date = db.Column(db.Date)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    external_ref = db.Column(db.String(100), nullable=True, index=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class ArchivedPayment(db.Model):
+    __table_args__ = (db.Index('ix_archived_payment_user_id', 'user_id', 'id'),)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer)
+    plan = db.Column(db.String(50))
+    amount = db.Column(db.Float)
+    status = db.Column(db.String(20))
+    provider = db.Column(db.String(50))
+    payment_id = db.Column(db.String(100), nullable=True)
+    due_date = db.Column(db.Date, nullable=True)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class ArchivedTransaction(db.Model):
+    __table_args__ = (db.Index('ix_archived_transaction_user_id', 'user_id', 'id'),)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer)
+    bill_id = db.Column(db.Integer, nullable=True)
+    amount = db.Column(db.Float)
+    method = db.Column(db.String(30))
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,166 @@
+# ----------------------------------File Header-------------------------------------------
+# notifications.py
+# Purpose: Write, page through and mark notifications while keeping each user's unread
+#          counter in step, plus the retention job that keeps the table bounded per user.
+
+# ----------------------------------Imports-------------------------------------------
+import click
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, update, delete, func, case
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import Notification, NotificationCounter
+from dashboard_versions import bump_version
+
+# ----------------------------------Unread Counter-------------------------------------------
+def _adjust_unread(deltas):
+    """Stage ``unread += delta`` for each user in ``deltas``; never drops below zero."""
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        value = NotificationCounter.unread + delta if delta > 0 else \
+            case((NotificationCounter.unread > -delta, NotificationCounter.unread + delta), else_=0)
+        stmt = update(NotificationCounter).values(unread=value)
+        result = db.session.execute(stmt.where(NotificationCounter.user_id.in_(user_ids)))
+        if result.rowcount == len(user_ids) or delta < 0:
+            continue
+        existing = {
+            uid for (uid,) in db.session.query(NotificationCounter.user_id)
+                                        .filter(NotificationCounter.user_id.in_(user_ids))
+        }
+        for uid in user_ids:
+            if uid in existing:
+                continue
+            try:
+                with db.session.begin_nested():
+                    db.session.add(NotificationCounter(user_id=uid, unread=delta))
+            except IntegrityError:
+                # Another worker created the row first; bump it instead.
+                db.session.execute(stmt.where(NotificationCounter.user_id == uid))
+
+def unread_count(user_id):
+    row = db.session.get(NotificationCounter, user_id)
+    return row.unread if row else 0
+
+# ----------------------------------Write-------------------------------------------
+def add_notifications(rows):
+    """Stage notifications in the current transaction; ``rows`` are dicts with user_id and message.
+
+    Use this instead of adding Notification rows directly, so the unread
+    counter moves in the same transaction as the insert.
+    """
+    if not rows:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(Notification), [
+        {"user_id": r["user_id"], "message": r["message"], "created_at": r.get("created_at") or now}
+        for r in rows
+    ])
+    _adjust_unread(Counter(r["user_id"] for r in rows))
+
+def add_notification(user_id, message):
+    add_notifications([{"user_id": user_id, "message": message}])
+
+# ----------------------------------Read-------------------------------------------
+def notification_to_dict(n):
+    return {
+        "id": n.id,
+        "message": n.message,
+        "created_at": n.created_at.isoformat() if n.created_at else None,
+        "read": n.read_at is not None
+    }
+
+def notification_page(user_id, cursor=None, limit=20, unread_only=False):
+    """Return one newest-first page of notifications and the cursor (last id seen) for the next."""
+    query = Notification.query.filter(Notification.user_id == user_id)
+    if unread_only:
+        query = query.filter(Notification.read_at.is_(None))
+    if cursor is not None:
+        query = query.filter(Notification.id < cursor)
+    rows = query.order_by(Notification.id.desc()).limit(limit + 1).all()
+    items = [notification_to_dict(n) for n in rows[:limit]]
+    next_cursor = items[-1]["id"] if len(rows) > limit else None
+    return items, next_cursor
+
+def mark_read(user_id, ids=None, up_to=None):
+    """Stage read markers for the user's unread notifications; returns how many changed.
+
+    With ``ids`` only those are marked, with ``up_to`` everything up to that id,
+    and with neither everything. Only rows that were still unread are counted,
+    so two tabs marking the same notifications read decrement the counter once.
+    """
+    stmt = update(Notification).where(Notification.user_id == user_id, Notification.read_at.is_(None))
+    if ids is not None:
+        stmt = stmt.where(Notification.id.in_(ids))
+    if up_to is not None:
+        stmt = stmt.where(Notification.id <= up_to)
+    marked = db.session.execute(stmt.values(read_at=datetime.utcnow())).rowcount
+    if marked:
+        _adjust_unread({user_id: -marked})
+        bump_version(user_id, "notifications")
+    return marked
+
+# ----------------------------------Retention-------------------------------------------
+def compact_notifications(keep=None, retention_days=None):
+    """Trim every user to their newest ``keep`` notifications and drop read ones past retention.
+
+    Returns the number of rows deleted. Unread rows that fall outside the cap
+    are deleted too, and the counter is decremented by exactly the unread rows
+    each DELETE ... RETURNING reports.
+    """
+    keep = keep or current_app.config.get("NOTIFICATION_KEEP_PER_USER", 200)
+    retention_days = retention_days or current_app.config.get("NOTIFICATION_RETENTION_DAYS", 90)
+    deleted = 0
+
+    over_cap = db.session.scalars(
+        select(Notification.user_id).group_by(Notification.user_id).having(func.count() > keep)
+    ).all()
+    for user_id in over_cap:
+        cutoff = db.session.scalar(
+            select(Notification.id).where(Notification.user_id == user_id)
+                                   .order_by(Notification.id.desc()).offset(keep).limit(1)
+        )
+        if cutoff is None:
+            continue
+        gone = db.session.execute(
+            delete(Notification).where(Notification.user_id == user_id, Notification.id <= cutoff)
+                                .returning(Notification.read_at)
+        ).all()
+        _adjust_unread({user_id: -sum(1 for (read_at,) in gone if read_at is None)})
+        bump_version(user_id, "notifications")
+        db.session.commit()
+        deleted += len(gone)
+
+    result = db.session.execute(
+        delete(Notification).where(Notification.read_at.is_not(None),
+                                   Notification.created_at < datetime.utcnow() - timedelta(days=retention_days))
+    )
+    db.session.commit()
+    return deleted + result.rowcount
+
+def recount_unread():
+    """Rebuild every counter from the table; a repair tool, not something the app needs to run."""
+    counts = dict(db.session.query(Notification.user_id, func.count())
+                            .filter(Notification.read_at.is_(None))
+                            .group_by(Notification.user_id).all())
+    db.session.execute(delete(NotificationCounter))
+    if counts:
+        db.session.execute(insert(NotificationCounter),
+                           [{"user_id": uid, "unread": n} for uid, n in counts.items()])
+    db.session.commit()
+    return len(counts)
+
+# ----------------------------------CLI Command-------------------------------------------
+@click.command("compact-notifications")
+@click.option("--keep", default=None, type=int, help="Notifications to keep per user.")
+@click.option("--retention-days", default=None, type=int, help="Delete read notifications older than this.")
+@click.option("--recount", is_flag=True, help="Also rebuild the unread counters from scratch.")
+def compact_notifications_command(keep, retention_days, recount):
+    """Apply the notification retention policy in the foreground."""
+    click.echo(f"Deleted {compact_notifications(keep, retention_days)} notifications.")
+    if recount:
+        click.echo(f"Recounted unread notifications for {recount_unread()} users.")
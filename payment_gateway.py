@@ -0,0 +1,230 @@
+# ----------------------------------File Header-------------------------------------------
+# payment_gateway.py
+# Purpose: Razorpay client with pooled connections, strict timeouts and a circuit breaker,
+#          plus reuse of open orders per (bill, amount).
+
+# ----------------------------------Imports-------------------------------------------
+import os
+import time
+import threading
+import uuid
+import razorpay
+import requests
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
+from requests.adapters import HTTPAdapter
+from extensions import db
+from models import PaymentOrder
+from metrics import observe_outbound
+
+# ----------------------------------Errors-------------------------------------------
+class GatewayUnavailable(Exception):
+    """Raised instead of calling Razorpay while the circuit breaker is open."""
+
+class OrderInProgress(Exception):
+    """Raised when a concurrent request is still creating the order for the same bill and amount."""
+
+# ----------------------------------HTTP Session-------------------------------------------
+class TimeoutSession(requests.Session):
+    """requests.Session that applies a default (connect, read) timeout to every call."""
+
+    def __init__(self, timeout, pool_size=10):
+        super().__init__()
+        self.timeout = timeout
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+# ----------------------------------Circuit Breaker-------------------------------------------
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and lets one trial call
+    through every ``reset_seconds`` until a call succeeds again."""
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                raise GatewayUnavailable("Payment gateway temporarily unavailable")
+            # Half-open: push the window forward so only this caller probes the gateway.
+            self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+# ----------------------------------Razorpay Gateway-------------------------------------------
+GATEWAY_FAILURES = (requests.RequestException, razorpay.errors.ServerError, razorpay.errors.GatewayError)
+
+class RazorpayGateway:
+    """Razorpay access for one process.
+
+    The HTTP session and client are built on first use and rebuilt after a
+    fork, so an app created in the gunicorn master (``--preload``) never shares
+    pooled sockets with its workers.
+    """
+
+    def __init__(self, key_id, key_secret, base_url=None, connect_timeout=3.05, read_timeout=10,
+                 pool_size=10, failure_threshold=5, reset_seconds=30):
+        self.key_id = key_id
+        self._key_secret = key_secret
+        self._options = {"base_url": base_url} if base_url else {}
+        self._timeout = (connect_timeout, read_timeout)
+        self._pool_size = pool_size
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+
+    @property
+    def client(self):
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    session = TimeoutSession(self._timeout, self._pool_size)
+                    self._client = razorpay.Client(session=session, auth=(self.key_id, self._key_secret),
+                                                   **self._options)
+                    self._pid = os.getpid()
+        return self._client
+
+    def _call(self, fn, *args):
+        self.breaker.before_call()
+        operation = f"{type(fn.__self__).__name__.lower()}.{fn.__name__}"
+        try:
+            with observe_outbound("razorpay", operation):
+                result = fn(*args)
+        except GATEWAY_FAILURES:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def create_order(self, data):
+        return self._call(self.client.order.create, data)
+
+    def verify_payment_signature(self, params):
+        # Pure HMAC check, no network call, so it bypasses the breaker.
+        return self.client.utility.verify_payment_signature(params)
+
+def init_gateway(app):
+    app.extensions["razorpay"] = RazorpayGateway(
+        app.config["RAZORPAY_KEY_ID"], app.config["RAZORPAY_KEY_SECRET"],
+        base_url=app.config.get("RAZORPAY_BASE_URL"),
+        connect_timeout=app.config.get("RAZORPAY_CONNECT_TIMEOUT", 3.05),
+        read_timeout=app.config.get("RAZORPAY_READ_TIMEOUT", 10),
+        pool_size=app.config.get("RAZORPAY_POOL_SIZE", 10),
+        failure_threshold=app.config.get("RAZORPAY_BREAKER_THRESHOLD", 5),
+        reset_seconds=app.config.get("RAZORPAY_BREAKER_RESET_SECONDS", 30)
+    )
+
+def get_gateway():
+    return current_app.extensions["razorpay"]
+
+# ----------------------------------Order Reuse-------------------------------------------
+# A 'Creating' row whose request died mid-call stops blocking new orders after this long.
+CREATING_TIMEOUT = timedelta(minutes=1)
+
+def _open_order(bill_id, amount_paise, cutoff):
+    return PaymentOrder.query.filter(
+        PaymentOrder.bill_id == bill_id,
+        PaymentOrder.amount_paise == amount_paise,
+        PaymentOrder.status == "Created",
+        PaymentOrder.created_at >= cutoff
+    ).first()
+
+def _expire_open_orders(bill_id, amount_paise, cutoff):
+    db.session.query(PaymentOrder).filter(
+        PaymentOrder.bill_id == bill_id,
+        PaymentOrder.amount_paise == amount_paise,
+        or_(and_(PaymentOrder.status == "Created", PaymentOrder.created_at < cutoff),
+            and_(PaymentOrder.status == "Creating",
+                 PaymentOrder.created_at < datetime.utcnow() - CREATING_TIMEOUT))
+    ).update({"status": "Expired"}, synchronize_session=False)
+
+def _wait_for_order(bill_id, amount_paise, cutoff):
+    """Order id created by the concurrent request holding the 'Creating' row."""
+    deadline = time.monotonic() + sum(get_gateway()._timeout)
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        existing = _open_order(bill_id, amount_paise, cutoff)
+        db.session.rollback()
+        if existing:
+            return existing.order_id
+    raise OrderInProgress("An order for this bill is already being created, please retry.")
+
+def get_or_create_order(bill, user_id, amount_paise):
+    """Return an open Razorpay order for this bill and amount, creating one only when needed.
+
+    Orders are keyed by (bill_id, amount in paise), so a retry or double-click
+    reuses the order from the previous attempt while a changed amount (a new
+    day's penalty) gets a fresh one. Reuse stops after RAZORPAY_ORDER_TTL_SECONDS.
+
+    Concurrent requests are serialised by a 'Creating' placeholder row under the
+    partial unique index ``ux_payment_order_open``: only the request that inserts
+    it calls Razorpay, the others wait for its order and reuse it.
+    """
+    ttl = current_app.config.get("RAZORPAY_ORDER_TTL_SECONDS", 900)
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    existing = _open_order(bill.id, amount_paise, cutoff)
+    if existing:
+        return existing.order_id, True
+
+    _expire_open_orders(bill.id, amount_paise, cutoff)
+    claim = PaymentOrder(bill_id=bill.id, user_id=user_id, amount_paise=amount_paise,
+                         order_id=f"creating_{uuid.uuid4().hex}", status="Creating")
+    db.session.add(claim)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return _wait_for_order(bill.id, amount_paise, cutoff), True
+
+    try:
+        order = get_gateway().create_order({
+            "amount": amount_paise,
+            "currency": "INR",
+            "payment_capture": 1,
+            "notes": {"bill_id": str(bill.id), "user_id": str(user_id)}
+        })
+    except Exception:
+        db.session.rollback()
+        db.session.query(PaymentOrder).filter_by(id=claim.id).delete(synchronize_session=False)
+        db.session.commit()
+        raise
+    claim.order_id = order["id"]
+    claim.status = "Created"
+    db.session.commit()
+    return order["id"], False
+
+def mark_order_paid(order_id):
+    if order_id:
+        PaymentOrder.query.filter_by(order_id=order_id).update({"status": "Paid"})
@@ -0,0 +1,107 @@
+# ----------------------------------File Header-------------------------------------------
+# penalties.py
+# Purpose: The single late-fee rule, priced for one bill or a batch, and the periodic
+#          job that notifies users of newly overdue bills in bulk.
+
+# ----------------------------------Imports-------------------------------------------
+import click
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import select, update
+from extensions import db
+from models import Bill
+from dashboard_versions import bump_version
+from notifications import add_notifications
+from events import publish_event
+
+# ----------------------------------Late-Fee Rule-------------------------------------------
+PENALTY_PER_DAY = 10
+
+Quote = namedtuple("Quote", "bill_id bill_type amount_due due_date days_overdue penalty total_amount")
+
+def _today():
+    return datetime.utcnow().date()
+
+def days_overdue(due_date, today=None):
+    today = today or _today()
+    return max(0, (today - due_date).days) if due_date else 0
+
+def quote_bills(bills, today=None):
+    """Price a list of bills (ORM rows or anything with the same attributes) in one pass."""
+    today = today or _today()
+    quotes = []
+    for b in bills:
+        days = days_overdue(b.due_date, today)
+        penalty = PENALTY_PER_DAY * days
+        amount = float(b.amount_due or 0)
+        quotes.append(Quote(b.id, b.bill_type, amount, b.due_date, days, penalty, amount + penalty))
+    return quotes
+
+def quote_bill(bill, today=None):
+    return quote_bills([bill], today)[0]
+
+def quote_to_dict(q):
+    return {
+        "bill_id": q.bill_id,
+        "bill_type": q.bill_type,
+        "amount_due": q.amount_due,
+        "due_date": q.due_date.isoformat() if q.due_date else None,
+        "days_overdue": q.days_overdue,
+        "penalty": q.penalty,
+        "total_amount": q.total_amount
+    }
+
+def quote_user_bills(user_id, bill_ids=None, today=None):
+    """Quote the user's pending bills (or just ``bill_ids`` of them) with one query."""
+    query = Bill.query.filter(Bill.user_id == user_id, Bill.status == "Pending")
+    if bill_ids is not None:
+        query = query.filter(Bill.id.in_(bill_ids))
+    return quote_bills(query.order_by(Bill.due_date.asc()).all(), today)
+
+# ----------------------------------Overdue Notifications-------------------------------------------
+def notify_overdue_bills(today=None, chunk_size=1000):
+    """Notify the owner of every bill that went overdue since the last run; returns the count.
+
+    Each chunk flips ``overdue_notified`` with a conditional UPDATE ... RETURNING,
+    so only the rows this run actually claimed get a notification even when
+    several workers run the job at once.
+    """
+    today = today or _today()
+    notified = 0
+    while True:
+        ids = db.session.scalars(
+            select(Bill.id).where(Bill.status == "Pending", Bill.due_date < today,
+                                  Bill.overdue_notified.is_(False))
+                           .order_by(Bill.id).limit(chunk_size)
+        ).all()
+        if not ids:
+            break
+        claimed = db.session.execute(
+            update(Bill).where(Bill.id.in_(ids), Bill.overdue_notified.is_(False))
+                        .values(overdue_notified=True)
+                        .returning(Bill.user_id, Bill.bill_type, Bill.amount_due, Bill.due_date)
+        ).all()
+        if claimed:
+            now = datetime.utcnow()
+            add_notifications([
+                {
+                    "user_id": user_id,
+                    "message": f"⚠️ Your {bill_type} bill of ₹{amount_due:.2f} was due on {due_date.isoformat()}. "
+                               f"A late fee of ₹{PENALTY_PER_DAY} per day now applies.",
+                    "created_at": now
+                }
+                for user_id, bill_type, amount_due, due_date in claimed
+            ])
+            bump_version([row.user_id for row in claimed], "notifications")
+        db.session.commit()
+        if claimed:
+            publish_event(sorted({row.user_id for row in claimed}), "notification",
+                          {"message": "You have overdue bills."})
+        notified += len(claimed)
+    return notified
+
+# ----------------------------------CLI Command-------------------------------------------
+@click.command("notify-overdue")
+def notify_overdue_command():
+    """Send overdue notifications for bills that passed their due date."""
+    click.echo(f"Notified {notify_overdue_bills()} newly overdue bills.")
@@ -0,0 +1,94 @@
+# ----------------------------------File Header-------------------------------------------
+# query_plans.py
+# Purpose: Assert that every hot query is served by the index built for it.
+
+# ----------------------------------Imports-------------------------------------------
+import sys
+import click
+from datetime import date, datetime
+from sqlalchemy import select, exists, text
+from extensions import db
+from models import Bill, Transaction, Notification, UserProfile, Payment, ArchivedTransaction
+
+# ----------------------------------Hot Queries-------------------------------------------
+def hot_queries():
+    """(name, statement, acceptable index or indexes) for every hot read path."""
+    now = datetime.utcnow()
+    return [
+        ("dashboard current bill",
+         select(Bill).where(Bill.user_id == 1, Bill.status == "Pending")
+                     .order_by(Bill.created_at.desc()).limit(1),
+         "ix_bill_user_status_created"),
+        ("dashboard upcoming bills",
+         select(Bill).where(Bill.user_id == 1, Bill.status == "Pending")
+                     .order_by(Bill.due_date.asc()),
+         "ix_bill_user_status_due_date"),
+        ("monthly bill anti-join probe",
+         select(exists().where(Bill.user_id == 1, Bill.created_at >= now, Bill.created_at < now)),
+         ("ix_bill_user_status_created", "ix_bill_user_status_due_date")),
+        ("overdue range scan",
+         select(Bill.id).where(Bill.status == "Pending", Bill.due_date < date.today()),
+         "ix_bill_status_due_date"),
+        ("transaction history page",
+         select(Transaction).where(Transaction.user_id == 1, Transaction.id < 1000)
+                            .order_by(Transaction.id.desc()).limit(21),
+         "ix_transaction_user_id_id"),
+        ("archived transaction history page",
+         select(ArchivedTransaction).where(ArchivedTransaction.user_id == 1, ArchivedTransaction.id < 1000)
+                                    .order_by(ArchivedTransaction.id.desc()).limit(21),
+         "ix_archived_transaction_user_id"),
+        ("latest notifications",
+         select(Notification).where(Notification.user_id == 1)
+                             .order_by(Notification.created_at.desc()).limit(5),
+         "ix_notification_user_created"),
+        ("notification feed page",
+         select(Notification).where(Notification.user_id == 1, Notification.id < 1000)
+                             .order_by(Notification.id.desc()).limit(21),
+         "ix_notification_user_id_id"),
+        ("user profile",
+         select(UserProfile).where(UserProfile.user_id == 1).limit(1),
+         "ix_user_profile_user_id"),
+        ("payment history",
+         select(Payment).where(Payment.user_id == 1),
+         "ix_payment_user_id"),
+    ]
+
+# ----------------------------------Plan Inspection-------------------------------------------
+def explain(conn, stmt):
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql)).fetchall()
+        return "\n".join(str(row[-1]) for row in rows)
+    if dialect == "postgresql":
+        # Tiny tables make a sequential scan cheapest; disable it so the plan shows the usable index.
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = conn.execute(text("EXPLAIN " + sql)).fetchall()
+        return "\n".join(row[0] for row in rows)
+    raise click.ClickException(f"Unsupported dialect {dialect}: plan checks run on sqlite and postgresql only.")
+
+def check_query_plans():
+    """Return a list of (name, expected_indexes, plan, ok)."""
+    results = []
+    with db.engine.connect() as conn:
+        with conn.begin():
+            for name, stmt, indexes in hot_queries():
+                if isinstance(indexes, str):
+                    indexes = (indexes,)
+                plan = explain(conn, stmt)
+                results.append((name, indexes, plan, any(i in plan for i in indexes)))
+    return results
+
+# ----------------------------------CLI Command-------------------------------------------
+@click.command("check-query-plans")
+def check_query_plans_command():
+    """Fail unless each hot query uses its index."""
+    failed = 0
+    for name, indexes, plan, ok in check_query_plans():
+        click.echo(f"[{'ok' if ok else 'FAIL'}] {name} -> {' or '.join(indexes)}")
+        if not ok:
+            failed += 1
+            click.echo("    " + plan.replace("\n", "\n    "))
+    if failed:
+        click.echo(f"{failed} hot queries are not using their index.")
+        sys.exit(1)
@@ -0,0 +1,176 @@
+# ----------------------------------File Header-------------------------------------------
+# razorpay_webhooks.py
+# Purpose: Durable inbox for signed Razorpay webhooks and the batched reconciler that
+#          settles the bills they refer to.
+
+# ----------------------------------Imports-------------------------------------------
+import hmac
+import json
+import uuid
+import hashlib
+import click
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update, or_, and_
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import WebhookEvent, PaymentOrder, Bill, Payment
+from settlement import settle_bill, order_penalty
+from payment_gateway import mark_order_paid
+from events import publish_event
+
+# ----------------------------------Settings-------------------------------------------
+SETTLING_EVENTS = ("payment.captured", "order.paid")
+CLAIM_TIMEOUT = timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+
+# ----------------------------------Signatures-------------------------------------------
+def sign_webhook(body, secret):
+    """Razorpay's X-Razorpay-Signature for ``body``: hex HMAC-SHA256 keyed by the webhook secret."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+def verify_webhook_signature(body, signature, secret):
+    return bool(signature) and hmac.compare_digest(sign_webhook(body, secret), signature)
+
+def fake_payment_event(order_id, payment_id, amount_paise, event="payment.captured"):
+    """A minimal Razorpay-shaped payload for local testing; sign it with ``sign_webhook``."""
+    return {
+        "entity": "event",
+        "event": event,
+        "contains": ["payment"],
+        "payload": {"payment": {"entity": {
+            "id": payment_id, "entity": "payment", "amount": amount_paise, "currency": "INR",
+            "status": "captured" if event != "payment.failed" else "failed", "order_id": order_id
+        }}},
+        "created_at": int(datetime.utcnow().timestamp())
+    }
+
+# ----------------------------------Inbox-------------------------------------------
+def enqueue_webhook(body, event_id=None):
+    """Append a verified webhook to the inbox; returns False if ``event_id`` was seen before."""
+    data = json.loads(body)
+    payment = ((data.get("payload") or {}).get("payment") or {}).get("entity") or {}
+    order = ((data.get("payload") or {}).get("order") or {}).get("entity") or {}
+    row = WebhookEvent(
+        event_id=event_id,
+        event=data.get("event") or "unknown",
+        payment_id=payment.get("id"),
+        order_id=payment.get("order_id") or order.get("id"),
+        payload=body.decode("utf-8") if isinstance(body, bytes) else body
+    )
+    try:
+        db.session.add(row)
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+def claim_events(limit):
+    """Claim up to ``limit`` pending events with a conditional UPDATE, as the email outbox does."""
+    now = datetime.utcnow()
+    due = or_(
+        WebhookEvent.status == "Pending",
+        and_(WebhookEvent.status == "Processing", WebhookEvent.claimed_at < now - CLAIM_TIMEOUT)
+    )
+    ids = [i for (i,) in db.session.query(WebhookEvent.id).filter(due)
+                                   .order_by(WebhookEvent.id).limit(limit)]
+    if not ids:
+        db.session.rollback()
+        return []
+    token = uuid.uuid4().hex
+    db.session.execute(
+        update(WebhookEvent).where(WebhookEvent.id.in_(ids), due)
+                            .values(status="Processing", claim_token=token, claimed_at=now)
+    )
+    db.session.commit()
+    return WebhookEvent.query.filter_by(claim_token=token).order_by(WebhookEvent.id).all()
+
+# ----------------------------------Reconciler-------------------------------------------
+def _finish(row, status, error=None):
+    row.status = status
+    row.error = error
+    row.claim_token = None
+    row.processed_at = datetime.utcnow()
+
+def reconcile_batch(rows):
+    """Apply one claimed batch in a single transaction; returns the number of bills settled.
+
+    Orders, bills and already-recorded payment ids are each loaded with one
+    query for the whole batch. Events are deduplicated by payment_id, both
+    within the batch and against Payment rows written by the client-driven
+    verify path, and the bill itself is settled through ``settle_bill``, so a
+    webhook and a browser callback racing for the same bill settle it once.
+    """
+    settling = [r for r in rows if r.event in SETTLING_EVENTS and r.order_id]
+    order_ids = {r.order_id for r in settling}
+    payment_ids = {r.payment_id for r in settling if r.payment_id}
+    orders = {o.order_id: o for o in PaymentOrder.query.filter(PaymentOrder.order_id.in_(order_ids))} \
+        if order_ids else {}
+    bill_ids = {o.bill_id for o in orders.values()}
+    bills = {b.id: b for b in Bill.query.filter(Bill.id.in_(bill_ids))} if bill_ids else {}
+    seen = {pid for (pid,) in db.session.query(Payment.payment_id)
+                                        .filter(Payment.payment_id.in_(payment_ids))} if payment_ids else set()
+
+    settled = []
+    for row in rows:
+        if row.event not in SETTLING_EVENTS:
+            _finish(row, "Ignored")
+            continue
+        if row.payment_id and row.payment_id in seen:
+            _finish(row, "Duplicate")
+            continue
+        order = orders.get(row.order_id)
+        bill = bills.get(order.bill_id) if order else None
+        if bill is None:
+            _finish(row, "Ignored", "Unknown order")
+            continue
+        try:
+            with db.session.begin_nested():
+                penalty = order_penalty(bill, order)
+                result = settle_bill(
+                    bill, provider="Razorpay", method="Razorpay", penalty=penalty,
+                    payment_id=row.payment_id,
+                    message=f"{bill.bill_type} bill of ₹{order.amount_paise / 100:.2f} paid successfully via Razorpay."
+                )
+                mark_order_paid(row.order_id)
+        except Exception as e:
+            row.attempts += 1
+            row.claim_token = None
+            row.error = str(e)[:255]
+            row.status = "Failed" if row.attempts >= MAX_ATTEMPTS else "Pending"
+            continue
+        if row.payment_id:
+            seen.add(row.payment_id)
+        if result:
+            settled.append(result)
+            _finish(row, "Processed")
+        else:
+            _finish(row, "Duplicate", "Bill already paid")
+
+    db.session.commit()
+    for s in settled:
+        user_id = bills[s.bill_id].user_id
+        publish_event(user_id, "payment", {"bill_id": s.bill_id, "status": "Paid"})
+        publish_event(user_id, "notification", {"message": s.message})
+    return len(settled)
+
+def reconcile_pending_events(batch_size=None):
+    """Drain the inbox; returns (events handled, bills settled)."""
+    batch_size = batch_size or current_app.config.get("RAZORPAY_WEBHOOK_BATCH_SIZE", 100)
+    handled = settled = 0
+    while True:
+        rows = claim_events(batch_size)
+        if not rows:
+            return handled, settled
+        settled += reconcile_batch(rows)
+        handled += len(rows)
+
+# ----------------------------------CLI Command-------------------------------------------
+@click.command("reconcile-webhooks")
+def reconcile_webhooks_command():
+    """Apply queued Razorpay webhook events in the foreground."""
+    handled, settled = reconcile_pending_events()
+    click.echo(f"Handled {handled} webhook events, settled {settled} bills.")
@@ -0,0 +1,180 @@
+# ----------------------------------File Header-------------------------------------------
+# rollups.py
+# Purpose: Incrementally maintained analytics totals for the admin dashboard, plus a
+#          full rebuild from the base tables.
+
+# ----------------------------------Imports-------------------------------------------
+import click
+from collections import defaultdict
+from datetime import datetime, date
+from sqlalchemy import update, delete, select
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import (AnalyticsRollup, Bill, Payment, Transaction,
+                    ArchivedBill, ArchivedPayment, ArchivedTransaction)
+
+# ----------------------------------Metrics-------------------------------------------
+# metric        month            dimension       count / amount
+# billed        bill created     bill type       bills issued / amount billed
+# revenue       payment made     bill type       bills paid / amount collected
+# penalty       payment made     bill type       penalised payments / penalty collected
+# transactions  attempt made     status          attempts / amount attempted
+# pending       due month        due date (ISO)  unpaid bills / amount outstanding
+METRICS = ("billed", "revenue", "penalty", "transactions", "pending")
+
+def _month(value):
+    return value.strftime("%Y-%m")
+
+# ----------------------------------Entries-------------------------------------------
+def bill_created(bill_type, amount, due_date, created_at=None):
+    created_at = created_at or datetime.utcnow()
+    return [
+        ("billed", _month(created_at), bill_type, 1, float(amount)),
+        ("pending", _month(due_date), due_date.isoformat(), 1, float(amount)),
+    ]
+
+def bill_paid(bill_type, original_amount, due_date, penalty=0, paid_at=None):
+    paid_at = paid_at or datetime.utcnow()
+    entries = [
+        ("revenue", _month(paid_at), bill_type, 1, float(original_amount) + penalty),
+        ("pending", _month(due_date), due_date.isoformat(), -1, -float(original_amount)),
+    ]
+    if penalty:
+        entries.append(("penalty", _month(paid_at), bill_type, 1, float(penalty)))
+    return entries
+
+def transaction_recorded(status, amount, created_at=None):
+    created_at = created_at or datetime.utcnow()
+    return [("transactions", _month(created_at), status, 1, float(amount))]
+
+# ----------------------------------Apply-------------------------------------------
+def add_rollups(entries):
+    """Stage increments for every entry in the current transaction.
+
+    Entries with the same key are merged first, then each key is bumped with
+    an atomic ``UPDATE ... SET count = count + n``; a missing row is inserted
+    in a savepoint, falling back to the update when another worker created it
+    first. Call before ``db.session.commit()`` so totals move with the write.
+    """
+    merged = defaultdict(lambda: [0, 0.0])
+    for metric, month, dimension, count, amount in entries:
+        totals = merged[(metric, month, dimension or "Unknown")]
+        totals[0] += count
+        totals[1] += amount
+
+    for (metric, month, dimension), (count, amount) in sorted(merged.items()):
+        stmt = update(AnalyticsRollup).where(
+            AnalyticsRollup.metric == metric,
+            AnalyticsRollup.month == month,
+            AnalyticsRollup.dimension == dimension
+        ).values(count=AnalyticsRollup.count + count, amount=AnalyticsRollup.amount + amount)
+        if db.session.execute(stmt).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.add(AnalyticsRollup(metric=metric, month=month, dimension=dimension,
+                                               count=count, amount=amount))
+        except IntegrityError:
+            db.session.execute(stmt)
+
+# ----------------------------------Rebuild-------------------------------------------
+def rebuild_rollups(chunk_size=1000):
+    """Recompute every derivable metric from the base tables in one transaction.
+
+    Penalties are not recorded separately in the base tables, so existing
+    ``penalty`` rows are kept as they are.
+    """
+    totals = defaultdict(lambda: [0, 0.0])
+
+    def tally(entries):
+        for metric, month, dimension, count, amount in entries:
+            key = (metric, month, dimension or "Unknown")
+            totals[key][0] += count
+            totals[key][1] += amount
+
+    # Archived rows still count towards history, so every table is read in both tiers.
+    for bill in (Bill, ArchivedBill):
+        bills = select(bill.bill_type, bill.amount_due, bill.due_date, bill.created_at, bill.status)
+        for bill_type, amount, due_date, created_at, status in \
+                db.session.execute(bills.execution_options(yield_per=chunk_size)):
+            if created_at:
+                tally([("billed", _month(created_at), bill_type, 1, float(amount or 0))])
+            if status == "Pending" and due_date:
+                tally([("pending", _month(due_date), due_date.isoformat(), 1, float(amount or 0))])
+
+    for payment in (Payment, ArchivedPayment):
+        payments = select(payment.plan, payment.amount, payment.created_at).where(payment.status == "Paid")
+        for plan, amount, created_at in db.session.execute(payments.execution_options(yield_per=chunk_size)):
+            if created_at:
+                tally([("revenue", _month(created_at), plan, 1, float(amount or 0))])
+
+    for txn in (Transaction, ArchivedTransaction):
+        txns = select(txn.status, txn.amount, txn.created_at)
+        for status, amount, created_at in db.session.execute(txns.execution_options(yield_per=chunk_size)):
+            if created_at:
+                tally(transaction_recorded(status, amount or 0, created_at))
+
+    db.session.execute(delete(AnalyticsRollup).where(AnalyticsRollup.metric != "penalty"))
+    db.session.add_all([
+        AnalyticsRollup(metric=m, month=mo, dimension=d, count=c, amount=a)
+        for (m, mo, d), (c, a) in totals.items()
+    ])
+    db.session.commit()
+    return len(totals)
+
+# ----------------------------------Read-------------------------------------------
+def analytics_summary(months=12, today=None):
+    """Admin analytics for the last ``months`` months, read from the rollup table only."""
+    today = today or date.today()
+    year, month = today.year, today.month - (months - 1)
+    while month < 1:
+        year, month = year - 1, month + 12
+    first_month = f"{year:04d}-{month:02d}"
+
+    revenue = defaultdict(dict)
+    penalties = defaultdict(float)
+    txns = defaultdict(lambda: defaultdict(int))
+    overdue = {"count": 0, "amount": 0.0}
+    outstanding = {"count": 0, "amount": 0.0}
+
+    rows = AnalyticsRollup.query.filter(
+        (AnalyticsRollup.metric == "pending") | (AnalyticsRollup.month >= first_month)
+    ).all()
+    for row in rows:
+        if row.metric == "revenue":
+            revenue[row.month][row.dimension] = {"count": row.count, "amount": round(row.amount, 2)}
+        elif row.metric == "penalty":
+            penalties[row.month] += row.amount
+        elif row.metric == "transactions":
+            txns[row.month][row.dimension] += row.count
+        elif row.metric == "pending" and row.count:
+            outstanding["count"] += row.count
+            outstanding["amount"] += row.amount
+            if row.dimension < today.isoformat():
+                overdue["count"] += row.count
+                overdue["amount"] += row.amount
+
+    ratios = {}
+    for month_key, counts in txns.items():
+        total = sum(counts.values())
+        ratios[month_key] = {
+            "success": counts.get("Success", 0),
+            "failed": counts.get("Failed", 0),
+            "failure_rate": round(counts.get("Failed", 0) / total, 4) if total else 0.0
+        }
+
+    return {
+        "since": first_month,
+        "revenue_by_month": dict(sorted(revenue.items())),
+        "penalties_by_month": {k: round(v, 2) for k, v in sorted(penalties.items())},
+        "penalty_total": round(sum(penalties.values()), 2),
+        "transactions_by_month": dict(sorted(ratios.items())),
+        "overdue": {"count": overdue["count"], "amount": round(overdue["amount"], 2)},
+        "outstanding": {"count": outstanding["count"], "amount": round(outstanding["amount"], 2)}
+    }
+
+# ----------------------------------CLI Command-------------------------------------------
+@click.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Recompute the analytics rollups from the bill, payment and transaction tables."""
+    click.echo(f"Rebuilt {rebuild_rollups()} rollup rows.")
@@ -0,0 +1,104 @@
+# ----------------------------------File Header-------------------------------------------
+# scripts/bench_login.py
+# Purpose: Measure login throughput of a single worker with password hashing inline
+#          (before) versus in the process pool (after), and how much a cheap request
+#          running alongside the logins is slowed down.
+#
+# Usage:   python scripts/bench_login.py [--threads 16] [--seconds 10] [--pool-workers 2]
+#                                        [--method scrypt]
+
+# ----------------------------------Imports-------------------------------------------
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# ----------------------------------Helpers-------------------------------------------
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+def build_app(workers, method, workdir):
+    os.environ["PASSWORD_HASH_WORKERS"] = str(workers)
+    os.environ["PASSWORD_HASH_METHOD"] = method
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, f"bench-{workers}.db")
+    from main import create_app
+    from extensions import db
+    from models import User
+    from password_hashing import get_password_hasher
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if not User.query.filter_by(email="bench@example.com").first():
+            db.session.add(User(email="bench@example.com", username="bench", is_verified=True,
+                                password_hash=get_password_hasher().hash("benchmark-pw")))
+            db.session.commit()
+    return app
+
+def run(app, threads, seconds):
+    stop = time.monotonic() + seconds
+    logins, probes, errors = [], [], []
+
+    def login_loop():
+        client = app.test_client()
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            r = client.post("/auth/login", json={"email": "bench@example.com", "password": "benchmark-pw"})
+            (logins if r.status_code == 200 else errors).append(time.perf_counter() - t0)
+
+    def probe_loop():
+        client = app.test_client()
+        while time.monotonic() < stop:
+            t0 = time.perf_counter()
+            client.get("/")
+            probes.append(time.perf_counter() - t0)
+            time.sleep(0.05)
+
+    workers = [threading.Thread(target=login_loop) for _ in range(threads)]
+    workers.append(threading.Thread(target=probe_loop))
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return {
+        "logins_per_sec": len(logins) / seconds,
+        "login_p50_ms": percentile(logins, 50) * 1000,
+        "login_p95_ms": percentile(logins, 95) * 1000,
+        "probe_p95_ms": percentile(probes, 95) * 1000,
+        "errors": len(errors)
+    }
+
+# ----------------------------------Main-------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent login threads (gthread threads).")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--pool-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--method", default="scrypt", help="Werkzeug hash method, e.g. scrypt:16384:8:1")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-" + "x" * 32)
+    os.environ.setdefault("EVENT_BACKEND", "memory")
+    os.environ.setdefault("EMAIL_WORKERS", "0")
+
+    print(f"{args.threads} login threads for {args.seconds:.0f}s, method={args.method}")
+    for label, workers in (("inline", 0), (f"pool x{args.pool_workers}", args.pool_workers)):
+        app = build_app(workers, args.method, workdir)
+        run(app, 1, 1)  # warm up the pool and the sqlite file
+        result = run(app, args.threads, args.seconds)
+        print(f"{label:>10}: {result['logins_per_sec']:7.1f} logins/s  "
+              f"p50 {result['login_p50_ms']:7.1f} ms  p95 {result['login_p95_ms']:7.1f} ms  "
+              f"cheap-request p95 {result['probe_p95_ms']:7.1f} ms  errors {result['errors']}")
+        app.extensions["password_hasher"].shutdown()
+
+if __name__ == "__main__":
+    main()
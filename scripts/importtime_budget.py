@@ -0,0 +1,89 @@
+# ----------------------------------File Header-------------------------------------------
+# scripts/importtime_budget.py
+# Purpose: Measure how long "import main" and create_app() take in a fresh interpreter
+#          (python -X importtime) and fail when either exceeds its budget.
+#
+# Usage:   python scripts/importtime_budget.py [--budget-ms 1500] [--app-budget-ms 1000]
+#                                             [--top 15] [--runs 3]
+
+# ----------------------------------Imports-------------------------------------------
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# create_app() is timed in the same child so it only pays for what the import left undone.
+CHILD = """
+import time
+import main
+started = time.perf_counter()
+main.create_app()
+print("create_app_us", int((time.perf_counter() - started) * 1e6))
+"""
+
+# ----------------------------------Measurement-------------------------------------------
+def measure():
+    """Run one fresh interpreter; returns (import rows, import_us of main, create_app_us)."""
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="", PYTHONPATH=ROOT,
+               DATABASE_URL=os.environ.get("DATABASE_URL", "sqlite:///" + os.path.join(workdir, "t.db")),
+               EVENT_DB_PATH=os.path.join(workdir, "events.db"))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD], cwd=workdir, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.exit(proc.stderr[-2000:])
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    main_us = next(cum for _, cum, name in rows if name.strip() == "main")
+    app_us = int(proc.stdout.split("create_app_us", 1)[1].split()[0])
+    return rows, main_us, app_us
+
+def _depth(name):
+    return (len(name) - len(name.lstrip())) // 2
+
+def top_level(rows, count):
+    """Modules imported directly by main, slowest (cumulative) first.
+
+    importtime prints children before their parent, so main's children are the
+    depth-1 rows between the previous top-level row and main itself.
+    """
+    end = next(i for i, (_, _, name) in enumerate(rows) if name.strip() == "main")
+    start = end
+    while start > 0 and _depth(rows[start - 1][2]) > 0:
+        start -= 1
+    direct = [(cum, name.strip()) for _, cum, name in rows[start:end] if _depth(name) == 1]
+    return sorted(direct, reverse=True)[:count]
+
+# ----------------------------------Main-------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Budget for 'import main'.")
+    parser.add_argument("--app-budget-ms", type=float, default=1000, help="Budget for create_app().")
+    parser.add_argument("--top", type=int, default=15, help="How many slow imports to list.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to run; the fastest counts.")
+    args = parser.parse_args()
+
+    results = [measure() for _ in range(max(1, args.runs))]
+    rows, main_us, app_us = min(results, key=lambda r: r[1])
+    import_ms = main_us / 1000
+    app_ms = min(r[2] for r in results) / 1000
+
+    print(f"{'cumulative':>12}  module")
+    for cum, name in top_level(rows, args.top):
+        print(f"{cum / 1000:10.1f}ms  {name}")
+    print(f"\nimport main: {import_ms:.0f}ms (budget {args.budget_ms:.0f}ms)")
+    print(f"create_app(): {app_ms:.0f}ms (budget {args.app_budget_ms:.0f}ms)")
+    over = import_ms > args.budget_ms or app_ms > args.app_budget_ms
+    if over:
+        print("FAIL: startup budget exceeded")
+    sys.exit(1 if over else 0)
+
+if __name__ == "__main__":
+    main()
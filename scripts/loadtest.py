@@ -0,0 +1,438 @@
+# ----------------------------------File Header-------------------------------------------
+# scripts/loadtest.py
+# Purpose: Reproducible HTTP load test. Boots create_app() on a real threaded server against
+#          a freshly seeded database, points Razorpay and Brevo at a local fake, drives a
+#          weighted mix of /auth/* routes from many virtual users, and reports per-route
+#          p50/p95/p99 latency and throughput, saved as JSON for comparing commits.
+#
+# Usage:   python scripts/loadtest.py [--users 50] [--concurrency 16] [--duration 30] [--warmup 5]
+#                                     [--mix dashboard=50,transactions=10,...] [--provider-latency-ms 80]
+#                                     [--out results.json] [--compare baseline.json --threshold 20]
+#          With --compare, exits 1 if any route's p95 is more than --threshold percent slower.
+
+# ----------------------------------Imports-------------------------------------------
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import random
+import hashlib
+import logging
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import defaultdict, Counter
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = "loadtest-password"
+KEY_SECRET = "loadtest-razorpay-secret"
+DEFAULT_MIX = "dashboard=50,transactions=10,notifications=5,login=5,pay=10,razorpay=10,export=5,register=1"
+
+# ----------------------------------Helpers-------------------------------------------
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+def parse_mix(raw):
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# ----------------------------------Fake Providers-------------------------------------------
+class FakeProviders:
+    """One local HTTP server standing in for Razorpay orders and Brevo transactional email.
+
+    The app talks to it through its normal clients (RAZORPAY_BASE_URL, BREVO_API_URL), so
+    connection pooling, timeouts and the email outbox are exercised as in production;
+    ``latency`` adds a fixed delay per call to model the real providers' round trip.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        providers = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if providers.latency:
+                    time.sleep(providers.latency)
+                if self.path.endswith("/orders"):
+                    providers.calls["razorpay.orders"] += 1
+                    data = json.loads(body or b"{}")
+                    reply = {"id": "order_" + uuid.uuid4().hex[:14], "entity": "order",
+                             "amount": data.get("amount"), "currency": data.get("currency", "INR"),
+                             "status": "created"}
+                    self._reply(200, reply)
+                elif self.path.endswith("/smtp/email"):
+                    providers.calls["brevo.email"] += 1
+                    self._reply(201, {"messageId": f"<{uuid.uuid4().hex}@loadtest>"})
+                else:
+                    self._reply(404, {"error": "not faked"})
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+# ----------------------------------Setup-------------------------------------------
+def build_app(workdir, fakes, database_url=None):
+    os.environ.setdefault("JWT_SECRET_KEY", "loadtest-" + "x" * 32)
+    os.environ.setdefault("EVENT_BACKEND", "memory")
+    os.environ["DATABASE_URL"] = database_url or "sqlite:///" + os.path.join(workdir, "loadtest.db")
+    os.environ["RAZORPAY_KEY_ID"] = "rzp_test_loadtest"
+    os.environ["RAZORPAY_KEY_SECRET"] = KEY_SECRET
+    os.environ["RAZORPAY_BASE_URL"] = fakes.url
+    os.environ["BREVO_API_KEY"] = "loadtest"
+    os.environ["BREVO_API_URL"] = fakes.url + "/v3/smtp/email"
+    os.environ["MAIL_SENDER_EMAIL"] = "loadtest@example.com"
+    import email_validator
+    from main import create_app
+    from extensions import db
+
+    # Registration's MX lookup is an external dependency too; keep DNS out of the numbers.
+    email_validator.CHECK_DELIVERABILITY = False
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
+
+def seed(app, users, bills_per_user, history_per_user):
+    """Bulk-insert verified users with profiles, pending bills and paid history; returns their emails."""
+    from sqlalchemy import insert
+    from extensions import db
+    from models import User, UserProfile, Bill, Transaction, Payment
+    from notifications import add_notifications
+    from password_hashing import get_password_hasher
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    types = ("Electricity", "Water", "Gas", "Internet")
+    with app.app_context():
+        password_hash = get_password_hasher().hash(PASSWORD)
+        emails = [f"load{i}@example.com" for i in range(users)]
+        db.session.execute(insert(User), [
+            {"email": e, "username": e.split("@")[0], "password_hash": password_hash,
+             "is_verified": True, "is_admin": False, "created_at": now} for e in emails
+        ])
+        ids = [uid for (uid,) in db.session.query(User.id).filter(User.email.in_(emails)).order_by(User.id)]
+        db.session.execute(insert(UserProfile), [
+            {"user_id": uid, "name": f"Load {uid}", "plan": "Free", "total_payments": history_per_user,
+             "total_amount": 0.0, "balance": 0.0} for uid in ids
+        ])
+        for uid in ids:
+            paid = []
+            for n in range(history_per_user):
+                created = now - timedelta(days=rng.randint(1, 700), minutes=n)
+                paid.append({"user_id": uid, "bill_type": rng.choice(types),
+                             "amount_due": round(rng.uniform(300, 1200), 2),
+                             "due_date": created.date(), "status": "Paid", "created_at": created})
+            db.session.execute(insert(Bill), paid)
+            bill_ids = [bid for (bid,) in db.session.query(Bill.id).filter(Bill.user_id == uid)
+                                                                  .order_by(Bill.id)]
+            db.session.execute(insert(Transaction), [
+                {"user_id": uid, "bill_id": bid, "amount": b["amount_due"], "method": "UPI",
+                 "status": "Success", "created_at": b["created_at"]} for bid, b in zip(bill_ids, paid)
+            ])
+            db.session.execute(insert(Payment), [
+                {"user_id": uid, "plan": b["bill_type"], "amount": b["amount_due"], "status": "Paid",
+                 "provider": "Utility Service", "due_date": b["due_date"], "created_at": b["created_at"]}
+                for b in paid
+            ])
+            db.session.execute(insert(Bill), [
+                {"user_id": uid, "bill_type": rng.choice(types), "amount_due": round(rng.uniform(300, 1200), 2),
+                 "due_date": (now + timedelta(days=rng.randint(5, 30))).date(), "status": "Pending",
+                 "created_at": now} for _ in range(bills_per_user)
+            ])
+            add_notifications([{"user_id": uid, "message": f"Welcome #{n}"} for n in range(10)])
+        db.session.commit()
+    return emails
+
+def serve(app):
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+# ----------------------------------Recorder-------------------------------------------
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def add(self, route, seconds, status):
+        if not self.recording:
+            return
+        with self._lock:
+            self.latencies[route].append(seconds * 1000)
+            self.statuses[route][status] += 1
+            if status == "error" or status >= 500 or status in (400, 401, 403, 404, 409, 422):
+                self.errors[route] += 1
+
+    def summary(self, elapsed):
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            routes[route] = {
+                "requests": len(samples),
+                "errors": self.errors[route],
+                "rps": round(len(samples) / elapsed, 2),
+                "mean_ms": round(sum(samples) / len(samples), 2),
+                "p50_ms": round(percentile(samples, 50), 2),
+                "p95_ms": round(percentile(samples, 95), 2),
+                "p99_ms": round(percentile(samples, 99), 2),
+                "max_ms": round(max(samples), 2),
+                "statuses": {str(k): v for k, v in sorted(self.statuses[route].items(), key=str)},
+            }
+        everything = [s for samples in self.latencies.values() for s in samples]
+        total = {
+            "requests": len(everything),
+            "errors": sum(self.errors.values()),
+            "rps": round(len(everything) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(everything, 50), 2),
+            "p95_ms": round(percentile(everything, 95), 2),
+            "p99_ms": round(percentile(everything, 99), 2),
+        }
+        return routes, total
+
+# ----------------------------------Virtual User-------------------------------------------
+class VirtualUser:
+    """One browser-like client: a logged-in session with its own ETag and unpaid bills."""
+
+    def __init__(self, base, email, recorder):
+        self.base = base
+        self.email = email
+        self.recorder = recorder
+        self.http = requests.Session()
+        self.token = None
+        self.etag = None
+        self.bills = []
+
+    def call(self, route, method, path, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if self.token:
+            headers["Authorization"] = "Bearer " + self.token
+        start = time.perf_counter()
+        try:
+            resp = self.http.request(method, self.base + path, headers=headers, timeout=60, **kwargs)
+            resp.content  # streamed exports are timed to the last byte
+        except requests.RequestException:
+            self.recorder.add(route, time.perf_counter() - start, "error")
+            return None
+        self.recorder.add(route, time.perf_counter() - start, resp.status_code)
+        return resp
+
+    def login(self):
+        resp = self.call("login", "POST", "/auth/login", json={"email": self.email, "password": PASSWORD})
+        if resp is not None and resp.status_code == 200:
+            self.token = resp.json()["access_token"]
+
+    def dashboard(self):
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        resp = self.call("dashboard", "GET", "/auth/dashboard/data", headers=headers)
+        if resp is not None and resp.status_code == 200:
+            self.etag = resp.headers.get("ETag")
+            self.bills = [b["id"] for b in resp.json().get("upcoming", [])] or self.bills
+
+    def transactions(self):
+        self.call("transactions", "GET", "/auth/transactions?limit=20")
+
+    def notifications(self):
+        self.call("notifications", "GET", "/auth/notifications?limit=20")
+
+    def pay(self):
+        if self.bills:
+            self.call("pay", "POST", "/auth/bill/pay", json={"bill_id": self.bills.pop(), "method": "UPI"},
+                      headers={"Idempotency-Key": uuid.uuid4().hex})
+
+    def razorpay(self):
+        if not self.bills:
+            return
+        bill_id = self.bills.pop()
+        resp = self.call("create-order", "POST", "/auth/bill/create-order", json={"bill_id": bill_id})
+        if resp is None or resp.status_code != 200:
+            return
+        order_id = resp.json()["order_id"]
+        payment_id = "pay_" + uuid.uuid4().hex[:14]
+        signature = hmac.new(KEY_SECRET.encode(), f"{order_id}|{payment_id}".encode(), hashlib.sha256).hexdigest()
+        self.call("verify-payment", "POST", "/auth/bill/verify-payment",
+                  json={"bill_id": bill_id, "razorpay_order_id": order_id,
+                        "razorpay_payment_id": payment_id, "razorpay_signature": signature},
+                  headers={"Idempotency-Key": "rzp-" + payment_id})
+
+    def export(self):
+        self.call("export-csv", "GET", "/auth/download_bills_csv")
+
+    def register(self):
+        email = f"new-{uuid.uuid4().hex[:12]}@example.com"
+        self.call("register", "POST", "/auth/register",
+                  json={"email": email, "password": PASSWORD, "username": email.split("@")[0]})
+
+SCENARIOS = {
+    "dashboard": VirtualUser.dashboard,
+    "transactions": VirtualUser.transactions,
+    "notifications": VirtualUser.notifications,
+    "login": VirtualUser.login,
+    "pay": VirtualUser.pay,
+    "razorpay": VirtualUser.razorpay,
+    "export": VirtualUser.export,
+    "register": VirtualUser.register,
+}
+
+# ----------------------------------Run-------------------------------------------
+def run(base, emails, mix, concurrency, duration, warmup, recorder):
+    names, weights = zip(*mix.items())
+    stop = threading.Event()
+
+    def worker(n):
+        rng = random.Random(n)
+        vusers = [VirtualUser(base, email, recorder) for email in emails[n::concurrency]]
+        for vu in vusers:
+            vu.login()
+            vu.dashboard()
+        while not stop.is_set():
+            vu = rng.choice(vusers)
+            SCENARIOS[rng.choices(names, weights)[0]](vu)
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    time.sleep(warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    time.sleep(duration)
+    recorder.recording = False
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for t in threads:
+        t.join(timeout=30)
+    return elapsed
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    regressed = []
+    for route, now in results["routes"].items():
+        before = baseline["routes"].get(route)
+        if not before or not before["p95_ms"]:
+            continue
+        change = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        flag = "  REGRESSED" if change > threshold else ""
+        print(f"  {route:<16} p95 {before['p95_ms']:>9.2f} -> {now['p95_ms']:>9.2f} ms ({change:+.1f}%)"
+              f"  rps {before['rps']:>8.2f} -> {now['rps']:>8.2f}{flag}")
+        if flag:
+            regressed.append(route)
+    return regressed
+
+# ----------------------------------Main-------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test with fake Razorpay and Brevo")
+    parser.add_argument("--users", type=int, default=50, help="Seeded users (virtual users).")
+    parser.add_argument("--bills-per-user", type=int, default=200, help="Pending bills available to pay.")
+    parser.add_argument("--history-per-user", type=int, default=100, help="Paid bills/transactions per user.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Client threads.")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds.")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before measuring.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, name=weight,...")
+    parser.add_argument("--provider-latency-ms", type=float, default=80, help="Delay added by the fakes.")
+    parser.add_argument("--database-url", default=None, help="Run against this database instead of SQLite.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="JSON output path (default loadtest-<commit>.json).")
+    parser.add_argument("--compare", default=None, help="Earlier JSON result to compare p95 against.")
+    parser.add_argument("--threshold", type=float, default=20, help="Allowed p95 regression in percent.")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    random.seed(args.seed)
+    fakes = FakeProviders(args.provider_latency_ms / 1000)
+    app = build_app(tempfile.mkdtemp(), fakes, args.database_url)
+    print(f"seeding {args.users} users ...")
+    emails = seed(app, args.users, args.bills_per_user, args.history_per_user)
+    server, base = serve(app)
+    print(f"serving on {base}; {args.concurrency} clients, {args.warmup:.0f}s warm-up, {args.duration:.0f}s measured")
+
+    recorder = Recorder()
+    elapsed = run(base, emails, mix, args.concurrency, args.duration, args.warmup, recorder)
+    server.shutdown()
+    routes, total = recorder.summary(elapsed)
+
+    commit = git_commit()
+    results = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0],
+            "users": args.users,
+            "history_per_user": args.history_per_user,
+            "concurrency": args.concurrency,
+            "duration_s": round(elapsed, 2),
+            "mix": mix,
+            "provider_latency_ms": args.provider_latency_ms,
+            "provider_calls": dict(fakes.calls),
+        },
+        "total": total,
+        "routes": routes,
+    }
+
+    print(f"\n{'route':<16} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+    for route, r in routes.items():
+        print(f"{route:<16} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8.2f} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['max_ms']:>9.2f}")
+    print(f"{'total':<16} {total['requests']:>7} {total['errors']:>5} {total['rps']:>8.2f} "
+          f"{total['p50_ms']:>9.2f} {total['p95_ms']:>9.2f} {total['p99_ms']:>9.2f}")
+    print(f"provider calls: {dict(fakes.calls)}")
+
+    out = args.out or f"loadtest-{commit or 'local'}.json"
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {out}")
+
+    if args.compare:
+        regressed = compare(results, args.compare, args.threshold)
+        sys.exit(1 if regressed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# ----------------------------------File Header-------------------------------------------
+# scripts/send_fake_webhook.py
+# Purpose: Post a locally signed, Razorpay-shaped webhook to a running server, to exercise
+#          the webhook inbox and reconciler without a real payment.
+#
+# Usage:   RAZORPAY_WEBHOOK_SECRET=... python scripts/send_fake_webhook.py --order-id order_X \
+#              --amount-paise 50000 [--payment-id pay_Y] [--event payment.captured] \
+#              [--url http://localhost:5000/auth/razorpay/webhook]
+
+# ----------------------------------Imports-------------------------------------------
+import os
+import sys
+import json
+import uuid
+import argparse
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from razorpay_webhooks import sign_webhook, fake_payment_event
+
+# ----------------------------------Main-------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Send a signed fake Razorpay webhook")
+    parser.add_argument("--url", default="http://localhost:5000/auth/razorpay/webhook")
+    parser.add_argument("--secret", default=os.getenv("RAZORPAY_WEBHOOK_SECRET"))
+    parser.add_argument("--order-id", required=True)
+    parser.add_argument("--amount-paise", type=int, required=True)
+    parser.add_argument("--payment-id", default=None)
+    parser.add_argument("--event", default="payment.captured")
+    parser.add_argument("--event-id", default=None, help="X-Razorpay-Event-Id; reuse one to test dedupe.")
+    args = parser.parse_args()
+    if not args.secret:
+        parser.error("--secret or RAZORPAY_WEBHOOK_SECRET is required")
+
+    payment_id = args.payment_id or "pay_" + uuid.uuid4().hex[:14]
+    body = json.dumps(fake_payment_event(args.order_id, payment_id, args.amount_paise, args.event))
+    resp = requests.post(args.url, data=body, timeout=10, headers={
+        "Content-Type": "application/json",
+        "X-Razorpay-Signature": sign_webhook(body, args.secret),
+        "X-Razorpay-Event-Id": args.event_id or "evt_" + uuid.uuid4().hex[:14]
+    })
+    print(resp.status_code, resp.text.strip())
+
+if __name__ == "__main__":
+    main()
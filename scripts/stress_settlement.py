@@ -0,0 +1,124 @@
+# ----------------------------------File Header-------------------------------------------
+# scripts/stress_settlement.py
+# Purpose: Hammer one bill from many threads through /auth/bill/pay and
+#          /auth/bill/verify-payment, then check it was settled exactly once.
+#
+# Usage:   python scripts/stress_settlement.py [--threads 32] [--rounds 5] [--same-key]
+#          Exits 1 if any round double-settles a bill.
+
+# ----------------------------------Imports-------------------------------------------
+import os
+import sys
+import uuid
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# ----------------------------------Setup-------------------------------------------
+def build_app(workdir):
+    os.environ.setdefault("JWT_SECRET_KEY", "stress-" + "x" * 32)
+    os.environ.setdefault("EVENT_BACKEND", "memory")
+    os.environ.setdefault("EMAIL_WORKERS", "0")
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "stress.db")
+    from main import create_app
+    from extensions import db
+    from models import User, UserProfile
+    from werkzeug.security import generate_password_hash
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(email="stress@example.com", username="stress", is_verified=True,
+                    password_hash=generate_password_hash("stress-password"))
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(UserProfile(user_id=user.id, name="Stress", total_payments=0, total_amount=0))
+        db.session.commit()
+    return app
+
+def new_bill(app, overdue):
+    from extensions import db
+    from models import Bill, User
+    with app.app_context():
+        user = User.query.filter_by(email="stress@example.com").first()
+        due = date.today() - timedelta(days=3) if overdue else date.today() + timedelta(days=10)
+        bill = Bill(user_id=user.id, bill_type="Electricity", amount_due=500.0, due_date=due, status="Pending")
+        db.session.add(bill)
+        db.session.commit()
+        return bill.id
+
+def totals(app, bill_id):
+    from extensions import db
+    from models import Bill, Transaction, UserProfile
+    with app.app_context():
+        bill = db.session.get(Bill, bill_id)
+        return {
+            "transactions": Transaction.query.filter_by(bill_id=bill_id, status="Success").count(),
+            "profile": UserProfile.query.first(),
+            "amount": bill.amount_due
+        }
+
+# ----------------------------------Stress Round-------------------------------------------
+def hammer(app, token, bill_id, threads, same_key):
+    barrier = threading.Barrier(threads)
+    statuses = Counter()
+    lock = threading.Lock()
+    shared_key = uuid.uuid4().hex
+
+    def worker(i):
+        client = app.test_client()
+        headers = {"Authorization": "Bearer " + token,
+                   "Idempotency-Key": shared_key if same_key else uuid.uuid4().hex}
+        barrier.wait()
+        if i % 2:
+            r = client.post("/auth/bill/pay", headers=headers,
+                            json={"bill_id": bill_id, "confirm_payment": True})
+        else:
+            r = client.post("/auth/bill/verify-payment", headers=headers, json={"bill_id": bill_id})
+        with lock:
+            statuses[r.status_code] += 1
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return statuses
+
+# ----------------------------------Main-------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent settlement stress test")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--same-key", action="store_true", help="All threads share one Idempotency-Key.")
+    args = parser.parse_args()
+
+    app = build_app(tempfile.mkdtemp())
+    client = app.test_client()
+    token = client.post("/auth/login", json={"email": "stress@example.com",
+                                             "password": "stress-password"}).json["access_token"]
+    failures = 0
+    expected_payments, expected_amount = 0, 0.0
+    for n in range(args.rounds):
+        bill_id = new_bill(app, overdue=bool(n % 2))
+        statuses = hammer(app, token, bill_id, args.threads, args.same_key)
+        result = totals(app, bill_id)
+        expected_payments += 1
+        expected_amount += result["amount"]
+        profile = result["profile"]
+        ok = (result["transactions"] == 1 and profile.total_payments == expected_payments
+              and abs(profile.total_amount - expected_amount) < 0.01)
+        failures += not ok
+        print(f"round {n + 1}: bill {bill_id} statuses {dict(statuses)} "
+              f"success_txns={result['transactions']} profile_payments={profile.total_payments} "
+              f"profile_amount={profile.total_amount:.2f} -> {'ok' if ok else 'DOUBLE SETTLED'}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# ----------------------------------File Header-------------------------------------------
+# settlement.py
+# Purpose: Settle a bill exactly once, no matter how many requests or workers race to pay it.
+
+# ----------------------------------Imports-------------------------------------------
+from collections import namedtuple
+from sqlalchemy import update, func
+from extensions import db
+from models import Bill, Payment, Transaction, UserProfile
+from dashboard_versions import bump_version
+from rollups import add_rollups, bill_paid, transaction_recorded
+from notifications import add_notifications
+from penalties import quote_bill
+
+# ----------------------------------Order Penalty-------------------------------------------
+def order_penalty(bill, order=None):
+    """Late fee to settle ``bill`` with: whatever the Razorpay ``order`` charged above the
+    bill amount, or today's quoted penalty when there is no order on record."""
+    if order is None:
+        return quote_bill(bill).penalty
+    return max(0, round(order.amount_paise / 100 - float(bill.amount_due), 2))
+
+# ----------------------------------Settle Bill-------------------------------------------
+Settlement = namedtuple("Settlement", "bill_id bill_type original_amount penalty total_amount payment message")
+
+def settle_bill(bill, provider, method, penalty=0, payment_id=None, message=None):
+    """Stage the settlement of ``bill`` in the current transaction; the caller commits.
+
+    The bill is claimed with ``UPDATE ... WHERE status = 'Pending'``, so of any
+    number of concurrent callers exactly one gets a Settlement back and writes
+    the Payment, Transaction and profile totals; the rest get ``None`` and must
+    treat the bill as already paid. Profile totals are incremented in SQL
+    rather than read-modify-written, so parallel payments of different bills
+    never lose an update.
+    """
+    original = float(bill.amount_due)
+    total = original + penalty
+    claimed = db.session.execute(
+        update(Bill).where(Bill.id == bill.id, Bill.status == "Pending")
+                    .values(status="Paid", amount_due=total)
+                    .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        return None
+
+    user_id = bill.user_id
+    payment = Payment(user_id=user_id, plan=bill.bill_type, amount=total, status="Paid",
+                      provider=provider, due_date=bill.due_date, payment_id=payment_id)
+    db.session.add(payment)
+    db.session.add(Transaction(user_id=user_id, bill_id=bill.id, amount=total,
+                               method=method, status="Success"))
+    db.session.execute(
+        update(UserProfile).where(UserProfile.user_id == user_id).values(
+            total_payments=func.coalesce(UserProfile.total_payments, 0) + 1,
+            total_amount=func.coalesce(UserProfile.total_amount, 0.0) + total
+        )
+    )
+    message = message or f"{bill.bill_type} bill of ₹{total:.2f} paid successfully."
+    notes = [{"user_id": user_id, "message": f"⚠️ Penalty of ₹{penalty} added for {bill.bill_type} bill."}] \
+        if penalty else []
+    add_notifications(notes + [{"user_id": user_id, "message": message}])
+
+    add_rollups(bill_paid(bill.bill_type, original, bill.due_date, penalty)
+                + transaction_recorded("Success", total))
+    bump_version(user_id)
+    db.session.flush()
+    return Settlement(bill.id, bill.bill_type, original, penalty, total, payment, message)
@@ -0,0 +1,119 @@
+# ----------------------------------File Header-------------------------------------------
+# static_assets.py
+# Purpose: Content-hashed static URLs with immutable caching, precompressed gzip/brotli
+#          variants, and template pages rendered once at startup and served with ETags.
+
+# ----------------------------------Imports-------------------------------------------
+import os
+import gzip
+import hashlib
+import mimetypes
+from flask import Response, request, current_app, render_template
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# ----------------------------------Settings-------------------------------------------
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Unhashed URLs and pages may change on the next deploy, so clients revalidate them.
+REVALIDATE = "public, no-cache"
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 512
+
+# ----------------------------------Encoded Bodies-------------------------------------------
+class Asset:
+    """One file or page held in memory with its precompressed variants."""
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        self.variants = {}
+        if len(body) >= MIN_COMPRESS_BYTES and mimetype.startswith(COMPRESSIBLE):
+            candidates = {"gzip": gzip.compress(body, 9, mtime=0)}
+            if brotli is not None:
+                candidates["br"] = brotli.compress(body, quality=11)
+            self.variants = {enc: data for enc, data in candidates.items() if len(data) < len(body)}
+
+    def response(self, cache_control):
+        accepted = request.accept_encodings
+        encoding = next((enc for enc in ("br", "gzip") if enc in self.variants and accepted[enc]), None)
+        resp = Response(self.variants[encoding] if encoding else self.body, mimetype=self.mimetype)
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        if self.variants:
+            resp.vary.add("Accept-Encoding")
+        resp.set_etag(f"{self.digest}-{encoding}" if encoding else self.digest)
+        resp.headers["Cache-Control"] = cache_control
+        return resp.make_conditional(request)
+
+def _hashed_name(filename, digest):
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest}{ext}"
+
+# ----------------------------------Static Manifest-------------------------------------------
+class AssetManifest:
+    """Every file under the static folder, keyed by both its plain and its hashed name."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.assets = {}  # plain name -> Asset
+        self.hashed = {}  # plain name -> hashed name
+        self.by_hash = {}  # hashed name -> plain name
+        if not folder or not os.path.isdir(folder):
+            return
+        for root, _, files in os.walk(folder):
+            for name in files:
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, folder).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    body = f.read()
+                mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                asset = Asset(body, mimetype)
+                self.assets[filename] = asset
+                self.hashed[filename] = _hashed_name(filename, asset.digest)
+                self.by_hash[self.hashed[filename]] = filename
+
+    def serve(self, filename):
+        plain = self.by_hash.get(filename)
+        if plain is not None:
+            return self.assets[plain].response(IMMUTABLE)
+        if filename in self.assets:
+            return self.assets[filename].response(REVALIDATE)
+        # Added after startup: serve from disk until the next restart hashes it.
+        resp = current_app.send_static_file(filename)
+        resp.headers["Cache-Control"] = REVALIDATE
+        return resp
+
+def get_assets():
+    return current_app.extensions["static_assets"]
+
+def _hash_static_urls(endpoint, values):
+    if endpoint == "static" and "filename" in values:
+        values["filename"] = get_assets().hashed.get(values["filename"], values["filename"])
+
+# ----------------------------------Pre-rendered Pages-------------------------------------------
+def page_response(template):
+    """Serve a template rendered at startup; templates that depend on the request must not use this."""
+    return current_app.extensions["rendered_pages"][template].response(REVALIDATE)
+
+def _render_pages(app, templates):
+    pages = {}
+    with app.test_request_context("/"):
+        for template in templates:
+            pages[template] = Asset(render_template(template).encode("utf-8"), "text/html")
+    return pages
+
+# ----------------------------------App Integration-------------------------------------------
+def init_static_assets(app, pages=()):
+    """Hash and compress the static folder, take over the /static route and pre-render ``pages``.
+
+    Call after every blueprint is registered so the templates can build any URL.
+    """
+    manifest = AssetManifest(app.static_folder)
+    app.extensions["static_assets"] = manifest
+    app.view_functions["static"] = manifest.serve
+    app.url_defaults(_hash_static_urls)
+    app.extensions["rendered_pages"] = _render_pages(app, pages)
@@ -0,0 +1,121 @@
+# ----------------------------------File Header-------------------------------------------
+# token_blocklist.py
+# Purpose: Per-request JWT revocation checks against an in-memory copy of TokenBlocklist,
+#          refreshed incrementally, plus the purge of entries whose tokens have expired.
+
+# ----------------------------------Imports-------------------------------------------
+import time
+import threading
+import click
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, or_, and_
+from extensions import db, jwt
+from models import TokenBlocklist
+from background import run_in_background
+
+# ----------------------------------Settings-------------------------------------------
+# Re-read this far behind the newest row seen, so rows committed slightly out of
+# created_at order by another worker are still picked up.
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+# ----------------------------------Revoked Set-------------------------------------------
+class RevokedTokens:
+    """Process-local map of revoked JTI -> expiry.
+
+    ``is_revoked`` is a dict lookup. At most once every ``refresh_seconds`` the
+    calling request pulls rows written since the last refresh, so another
+    worker's logout is seen within that interval. Entries are dropped once
+    their token has expired, which keeps the map as small as the live table.
+    """
+
+    def __init__(self, refresh_seconds=5, purge_seconds=3600):
+        self.refresh_seconds = refresh_seconds
+        self.purge_seconds = purge_seconds
+        self._revoked = {}
+        self._since = None
+        self._next_refresh = 0.0
+        self._next_purge = time.monotonic() + purge_seconds
+        self._lock = threading.Lock()
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti):
+        if time.monotonic() >= self._next_refresh:
+            self.refresh()
+        return jti in self._revoked
+
+    def refresh(self):
+        with self._lock:
+            if time.monotonic() < self._next_refresh:
+                return
+            query = db.session.query(TokenBlocklist.jti, TokenBlocklist.expires_at,
+                                     TokenBlocklist.created_at)
+            if self._since is not None:
+                query = query.filter(TokenBlocklist.created_at >= self._since - REFRESH_OVERLAP)
+            newest = self._since
+            for jti, expires_at, created_at in query:
+                self._revoked[jti] = expires_at
+                if newest is None or created_at > newest:
+                    newest = created_at
+            self._since = newest or datetime.utcnow()
+
+            now = datetime.utcnow()
+            for jti in [j for j, exp in self._revoked.items() if exp is not None and exp < now]:
+                del self._revoked[jti]
+            self._next_refresh = time.monotonic() + self.refresh_seconds
+
+        if time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + self.purge_seconds
+            run_in_background(current_app._get_current_object(), purge_expired_tokens,
+                              name="token-blocklist-purge")
+
+    def __len__(self):
+        return len(self._revoked)
+
+def get_revoked_tokens():
+    return current_app.extensions["revoked_tokens"]
+
+# ----------------------------------Revoke & Purge-------------------------------------------
+def revoke_token(jwt_payload):
+    """Stage a TokenBlocklist row for this token; the caller commits."""
+    expires_at = datetime.utcfromtimestamp(jwt_payload["exp"]) if "exp" in jwt_payload else None
+    db.session.add(TokenBlocklist(jti=jwt_payload["jti"], created_at=datetime.utcnow(),
+                                  expires_at=expires_at))
+    get_revoked_tokens().add(jwt_payload["jti"], expires_at)
+
+def purge_expired_tokens():
+    """Delete entries whose token can no longer be presented; returns the row count.
+
+    Rows written before ``expires_at`` existed are kept for the longest token
+    lifetime (the refresh token's) after they were created.
+    """
+    now = datetime.utcnow()
+    legacy_cutoff = now - current_app.config["JWT_REFRESH_TOKEN_EXPIRES"]
+    result = db.session.execute(
+        delete(TokenBlocklist).where(or_(
+            TokenBlocklist.expires_at < now,
+            and_(TokenBlocklist.expires_at.is_(None), TokenBlocklist.created_at < legacy_cutoff)
+        ))
+    )
+    db.session.commit()
+    return result.rowcount
+
+# ----------------------------------App Integration-------------------------------------------
+def _token_in_blocklist(jwt_header, jwt_payload):
+    return get_revoked_tokens().is_revoked(jwt_payload["jti"])
+
+def init_token_blocklist(app):
+    app.extensions["revoked_tokens"] = RevokedTokens(
+        refresh_seconds=app.config.get("TOKEN_BLOCKLIST_REFRESH_SECONDS", 5),
+        purge_seconds=app.config.get("TOKEN_BLOCKLIST_PURGE_SECONDS", 3600)
+    )
+    jwt.token_in_blocklist_loader(_token_in_blocklist)
+
+# ----------------------------------CLI Command-------------------------------------------
+@click.command("purge-token-blocklist")
+def purge_token_blocklist_command():
+    """Delete blocklist entries for tokens that have already expired."""
+    click.echo(f"Purged {purge_expired_tokens()} expired blocklist entries.")
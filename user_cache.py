@@ -0,0 +1,118 @@
+# ----------------------------------File Header-------------------------------------------
+# user_cache.py
+# Purpose: Resolve the authenticated user from JWT claims, backed by a small
+#          process-local TTL cache of user snapshots.
+
+# ----------------------------------Imports-------------------------------------------
+import time
+import threading
+from collections import OrderedDict, namedtuple
+from flask import current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from extensions import db
+from models import User
+
+# ----------------------------------Snapshots-------------------------------------------
+UserSnapshot = namedtuple("UserSnapshot", "id email username is_admin is_verified")
+
+def _user_snapshot(user):
+    return UserSnapshot(user.id, user.email, user.username, user.is_admin, user.is_verified)
+
+# ----------------------------------TTL Cache-------------------------------------------
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire after ``ttl_seconds``."""
+
+    def __init__(self, max_entries=10000, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+def init_user_cache(app):
+    app.extensions["user_cache"] = TTLCache(
+        max_entries=app.config.get("USER_CACHE_MAX_ENTRIES", 10000),
+        ttl_seconds=app.config.get("USER_CACHE_TTL_SECONDS", 300)
+    )
+
+def _cache():
+    return current_app.extensions["user_cache"]
+
+# ----------------------------------Lookups-------------------------------------------
+def get_user(user_id):
+    cache = _cache()
+    snap = cache.get(("user", user_id))
+    if snap is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        snap = _user_snapshot(user)
+        cache.put(("user", user_id), snap)
+    return snap
+
+def get_user_by_email(email):
+    cache = _cache()
+    user_id = cache.get(("email", email))
+    if user_id is not None:
+        return get_user(user_id)
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        return None
+    snap = _user_snapshot(user)
+    cache.put(("user", user.id), snap)
+    cache.put(("email", email), user.id)
+    return snap
+
+def invalidate_user(user_id, email=None):
+    cache = _cache()
+    cache.pop(("user", user_id))
+    if email:
+        cache.pop(("email", email))
+
+# ----------------------------------Token Claims-------------------------------------------
+def token_claims(user):
+    """Extra claims embedded in access and refresh tokens at issue time."""
+    return {"uid": user.id, "role": "admin" if user.is_admin else "user"}
+
+def current_user_id():
+    """The caller's user id straight from the token; tokens issued before the
+    ``uid`` claim existed fall back to an email lookup."""
+    uid = get_jwt().get("uid")
+    if uid is not None:
+        return uid
+    user = get_user_by_email(get_jwt_identity())
+    return user.id if user else None
+
+def current_user():
+    uid = get_jwt().get("uid")
+    if uid is not None:
+        return get_user(uid)
+    return get_user_by_email(get_jwt_identity())
+
+def current_user_is_admin():
+    role = get_jwt().get("role")
+    if role is not None:
+        return role == "admin"
+    user = current_user()
+    return bool(user and user.is_admin)
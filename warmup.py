@@ -0,0 +1,70 @@
+# ----------------------------------File Header-------------------------------------------
+# warmup.py
+# Purpose: Prime a freshly started worker (database connections, caches, provider clients
+#          and background threads) before it accepts its first request.
+
+# ----------------------------------Imports-------------------------------------------
+import time
+from sqlalchemy import text
+from extensions import db
+from token_blocklist import get_revoked_tokens
+from password_hashing import get_password_hasher
+from payment_gateway import get_gateway
+from events import get_hub
+
+# ----------------------------------Steps-------------------------------------------
+def _database(app):
+    # Opens one pooled connection per engine, which also applies the SQLite pragmas.
+    for engine in db.engines.values():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+def _token_blocklist(app):
+    get_revoked_tokens().refresh()
+
+def _password_hasher(app):
+    get_password_hasher().warm_up()
+
+def _payment_gateway(app):
+    get_gateway().client
+
+def _background_threads(app):
+    pool = app.extensions.get("email_pool")
+    if pool is not None:
+        pool.ensure_started()
+    for task in app.extensions.get("periodic_tasks", {}).values():
+        task.ensure_started()
+    backend = get_hub().backend
+    if hasattr(backend, "ensure_polling"):
+        backend.ensure_polling()
+
+WARMUP_STEPS = (
+    ("database", _database),
+    ("token blocklist", _token_blocklist),
+    ("password hasher", _password_hasher),
+    ("payment gateway", _payment_gateway),
+    ("background threads", _background_threads),
+)
+
+# ----------------------------------Warm Up-------------------------------------------
+def warm_up(app):
+    """Run every warm-up step in this process; returns {step: seconds}.
+
+    A failing step is logged and skipped: the worker still starts and that
+    resource is initialised lazily on first use, as it would be without warm-up.
+    """
+    timings = {}
+    with app.app_context():
+        for name, step in WARMUP_STEPS:
+            started = time.perf_counter()
+            try:
+                step(app)
+            except Exception as e:
+                print(f"warm-up step {name} failed:", e)
+            finally:
+                db.session.remove()
+            timings[name] = time.perf_counter() - started
+    total = sum(timings.values()) * 1000
+    print(f"worker warm-up finished in {total:.0f}ms: "
+          + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+    return timings